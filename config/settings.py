@@ -137,7 +137,7 @@ MEDIA_URL = 'media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = env('EMAIL_BACKEND', default='main.delivery.mailqueue.QueuedEmailBackend')
 
 EMAIL_HOST = env('EMAIL_HOST')
 
@@ -179,3 +179,132 @@ CACHES = {
         'LOCATION': env('CACHES_LOCATION')
     }
 }
+
+MAILING_TRANSPORT = env('MAILING_TRANSPORT', default='pool')
+
+MAILING_CONCURRENCY = env.int('MAILING_CONCURRENCY', default=8)
+
+MAILING_PER_MAILING_CONCURRENCY = env.int('MAILING_PER_MAILING_CONCURRENCY', default=4)
+
+MAILING_SMTP_POOL_SIZE = env.int('MAILING_SMTP_POOL_SIZE', default=MAILING_CONCURRENCY)
+
+MAILING_SMTP_HEALTH_CHECK_INTERVAL = env.int('MAILING_SMTP_HEALTH_CHECK_INTERVAL', default=30)
+
+MAILING_SMTP_MAX_MESSAGES = env.int('MAILING_SMTP_MAX_MESSAGES', default=500)
+
+MAILING_WRITE_BATCH_SIZE = env.int('MAILING_WRITE_BATCH_SIZE', default=500)
+
+MAILING_WRITE_FLUSH_INTERVAL = env.float('MAILING_WRITE_FLUSH_INTERVAL', default=2.0)
+
+MAILING_OUTBOX_BATCH_SIZE = env.int('MAILING_OUTBOX_BATCH_SIZE', default=500)
+
+MAILING_OUTBOX_LEASE = env.int('MAILING_OUTBOX_LEASE', default=300)
+
+MAILING_SCHEDULER_MAX_IDLE = env.int('MAILING_SCHEDULER_MAX_IDLE', default=60)
+
+MAILING_SCHEDULER_FAILOVER_INTERVAL = env.int('MAILING_SCHEDULER_FAILOVER_INTERVAL', default=10)
+
+MAILING_SCHEDULER_TICK_BUDGET = env.float('MAILING_SCHEDULER_TICK_BUDGET', default=5.0)
+
+MAILING_RECIPIENTS_CHUNK_SIZE = env.int('MAILING_RECIPIENTS_CHUNK_SIZE', default=2000)
+
+MAILING_RELAY_RATE = env.float('MAILING_RELAY_RATE', default=0)
+
+MAILING_RELAY_BURST = env.float('MAILING_RELAY_BURST', default=0)
+
+MAILING_DOMAIN_RATE = env.float('MAILING_DOMAIN_RATE', default=0)
+
+MAILING_DOMAIN_BURST = env.float('MAILING_DOMAIN_BURST', default=0)
+
+MAILING_DOMAIN_RATES = env.dict('MAILING_DOMAIN_RATES', cast={'value': float}, default={})
+
+MAILING_RETRY_MAX_ATTEMPTS = env.int('MAILING_RETRY_MAX_ATTEMPTS', default=5)
+
+MAILING_RETRY_BASE_DELAY = env.float('MAILING_RETRY_BASE_DELAY', default=60)
+
+MAILING_RETRY_MAX_DELAY = env.float('MAILING_RETRY_MAX_DELAY', default=3600)
+
+MAILING_CHECKPOINT_SIZE = env.int('MAILING_CHECKPOINT_SIZE', default=100)
+
+MAILING_CHECKPOINT_INTERVAL = env.float('MAILING_CHECKPOINT_INTERVAL', default=1.0)
+
+MAILING_TEMPLATE_CACHE_SIZE = env.int('MAILING_TEMPLATE_CACHE_SIZE', default=256)
+
+MAILING_BATCH_RECIPIENTS = env.int('MAILING_BATCH_RECIPIENTS', default=100)
+
+MAILING_ADAPTIVE_CONCURRENCY = env.bool('MAILING_ADAPTIVE_CONCURRENCY', default=True)
+
+MAILING_MIN_CONCURRENCY = env.int('MAILING_MIN_CONCURRENCY', default=1)
+
+MAILING_ADAPTIVE_LATENCY_TOLERANCE = env.float('MAILING_ADAPTIVE_LATENCY_TOLERANCE', default=2.0)
+
+MAILING_METRICS_FLUSH_INTERVAL = env.float('MAILING_METRICS_FLUSH_INTERVAL', default=5.0)
+
+MAILING_METRICS_TOKEN = env('MAILING_METRICS_TOKEN', default='')
+
+MAILING_METRICS_BACKLOG_CACHE_TIMEOUT = env.int('MAILING_METRICS_BACKLOG_CACHE_TIMEOUT', default=15)
+
+MAILING_STAGE_TIMING = env.bool('MAILING_STAGE_TIMING', default=False)
+
+MAILING_PROFILE_DIR = env('MAILING_PROFILE_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+
+MAILING_SHARDED_SCHEDULING = env.bool('MAILING_SHARDED_SCHEDULING', default=False)
+
+MAILING_NODE_HEARTBEAT_INTERVAL = env.int('MAILING_NODE_HEARTBEAT_INTERVAL', default=10)
+
+MAILING_NODE_TTL = env.int('MAILING_NODE_TTL', default=30)
+
+MAILING_SHARD_REPLICAS = env.int('MAILING_SHARD_REPLICAS', default=64)
+
+MAILING_LANE_WEIGHTS = env.dict('MAILING_LANE_WEIGHTS', cast={'value': int},
+                                default={'transactional': 8, 'small': 3, 'bulk': 1})
+
+MAILING_LANE_RESERVED = env.dict('MAILING_LANE_RESERVED', cast={'value': int},
+                                 default={'transactional': 1, 'small': 1})
+
+MAILING_SMALL_MAILING_SIZE = env.int('MAILING_SMALL_MAILING_SIZE', default=1000)
+
+MAILING_TRANSACTIONAL_POLL_INTERVAL = env.float('MAILING_TRANSACTIONAL_POLL_INTERVAL', default=30.0)
+
+MAILING_SUPPRESSION_REFRESH_INTERVAL = env.float('MAILING_SUPPRESSION_REFRESH_INTERVAL', default=5.0)
+
+MAILING_SUPPRESSION_RELOAD_INTERVAL = env.float('MAILING_SUPPRESSION_RELOAD_INTERVAL', default=3600.0)
+
+MAILING_SUPPRESSION_REFRESH_MARGIN = env.float('MAILING_SUPPRESSION_REFRESH_MARGIN', default=60.0)
+
+MAILING_OUTBOX_RETENTION_DAYS = env.int('MAILING_OUTBOX_RETENTION_DAYS', default=30)
+
+MAILING_QUEUED_EMAIL_RETENTION_DAYS = env.int('MAILING_QUEUED_EMAIL_RETENTION_DAYS', default=7)
+
+MAILING_PURGE_INTERVAL = env.int('MAILING_PURGE_INTERVAL', default=3600)
+
+MAILING_PURGE_BATCH_SIZE = env.int('MAILING_PURGE_BATCH_SIZE', default=5000)
+
+MAILING_METRICS_GAUGE_TTL = env.int('MAILING_METRICS_GAUGE_TTL', default=300)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'default': {
+            'format': '{asctime} {levelname} {name}: {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'default',
+        },
+    },
+    'loggers': {
+        'main': {
+            'handlers': ['console'],
+            'level': env('MAILING_LOG_LEVEL', default='INFO'),
+        },
+        'users': {
+            'handlers': ['console'],
+            'level': env('MAILING_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
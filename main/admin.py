@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from main.models import Mailing, Client, MailingAttempt, BlogPost
+from main.models import Mailing, Client, MailingAttempt, BlogPost, OutboxMessage, QueuedEmail, \
+    SuppressedAddress, WorkerNode
 
 
 @admin.register(Mailing)
@@ -47,6 +48,87 @@ class MailingAttemptAdmin(admin.ModelAdmin):
     list_display = ('mailing', 'time','status', 'log_message')
 
 
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    """
+    Админ-интерфейс для просмотра очереди писем рассылок.
+
+    Отображает следующие поля в списке:
+    - mailing (Рассылка)
+    - client (Клиент)
+    - run_time (Время запуска рассылки)
+    - status (Статус)
+    - attempts (Количество попыток)
+    - next_attempt_at (Следующая попытка)
+    - lease_owner (Обработчик)
+    - lease_expires (Окончание аренды)
+
+    Включает фильтр по статусу.
+    """
+
+    list_display = ('mailing', 'client', 'run_time', 'status', 'attempts', 'next_attempt_at', 'lease_owner',
+                    'lease_expires')
+    list_filter = ('status',)
+    raw_id_fields = ('mailing', 'client')
+
+
+@admin.register(QueuedEmail)
+class QueuedEmailAdmin(admin.ModelAdmin):
+    """
+    Админ-интерфейс для просмотра очереди служебных писем.
+
+    Отображает следующие поля в списке:
+    - recipients (Получатели)
+    - created_at (Время постановки в очередь)
+    - status (Статус)
+    - attempts (Количество попыток)
+    - next_attempt_at (Следующая попытка)
+    - log_message (Ответ сервера)
+
+    Включает фильтр по статусу.
+    """
+
+    list_display = ('recipients', 'created_at', 'status', 'attempts', 'next_attempt_at', 'log_message')
+    list_filter = ('status',)
+    exclude = ('data',)
+
+
+@admin.register(SuppressedAddress)
+class SuppressedAddressAdmin(admin.ModelAdmin):
+    """
+    Админ-интерфейс для управления списком подавления адресов.
+
+    Отображает следующие поля в списке:
+    - email (Почта)
+    - owner (Владелец)
+    - reason (Причина)
+    - log_message (Ответ сервера)
+    - created_at (Время добавления)
+
+    Включает фильтр по причине и поиск по адресу. Удалённые адреса перестают подавляться после полной перезагрузки
+    снимка списка (MAILING_SUPPRESSION_RELOAD_INTERVAL).
+    """
+
+    list_display = ('email', 'owner', 'reason', 'log_message', 'created_at')
+    list_filter = ('reason',)
+    search_fields = ('email',)
+    raw_id_fields = ('owner',)
+
+
+@admin.register(WorkerNode)
+class WorkerNodeAdmin(admin.ModelAdmin):
+    """
+    Админ-интерфейс для просмотра узлов кластера, отправляющих рассылки.
+
+    Отображает следующие поля в списке:
+    - name (Узел)
+    - started_at (Время регистрации)
+    - heartbeat_at (Последний пульс)
+    """
+
+    list_display = ('name', 'started_at', 'heartbeat_at')
+
+
 @admin.register(BlogPost)
 class BlogPostAdmin(admin.ModelAdmin):
     """
@@ -1,11 +1,14 @@
 from django.apps import AppConfig
-from time import sleep
 
 
 class MainConfig(AppConfig):
     """
     Конфигурация приложения 'main'.
 
+    Планировщик рассылок при загрузке приложения не запускается: он работает в отдельном процессе,
+    запускаемом командой start_scheduling. При загрузке подключаются только обработчики сигналов, уведомляющие
+    планировщик об изменении рассылок.
+
     Атрибуты:
     default_auto_field (str): Тип поля по умолчанию для автоинкрементных полей.
     name (str): Имя приложения.
@@ -15,6 +18,4 @@ class MainConfig(AppConfig):
     name = 'main'
 
     def ready(self):
-        from .tasks import start
-        sleep(2)
-        start()
+        from . import signals  # noqa: F401
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveWindow:
+    """
+    Окно одновременных отправок, размер которого подбирается по задержке и временным ошибкам SMTP-сервера (AIMD).
+
+    Пока сервер отвечает быстро и без временных ошибок, окно растёт: сначала на единицу за каждую успешную отправку
+    (медленный старт), а после первого сокращения - на единицу за окно отправок. При временной ошибке (код 4xx
+    или обрыв соединения) либо при росте сглаженной задержки больше чем в latency_tolerance раз от базовой окно
+    сокращается в backoff раз, но не чаще одного раза за время ответа сервера.
+
+    Места в окне распределяются между полосами приоритета (см. LANES): если места ждут отправки нескольких полос,
+    освободившееся место отдаётся по взвешенному циклическому алгоритму (smooth weighted round-robin) согласно
+    весам weights, поэтому служебные письма не ждут за очередью крупной рассылки, а крупная рассылка не простаивает
+    полностью. Кроме того, для каждой полосы в окне резервируется reserved мест, которые не могут занять полосы
+    с меньшим приоритетом (но не меньше одного места на полосу).
+
+    Атрибуты:
+        min_limit (int): Минимальный размер окна.
+        max_limit (int): Максимальный размер окна.
+        latency_tolerance (float): Во сколько раз сглаженная задержка может превышать базовую.
+        backoff (float): Множитель сокращения окна.
+        weights (tuple[int]): Веса полос приоритета по индексу полосы.
+        reserved (tuple[int]): Количество мест, зарезервированных для каждой полосы от полос с меньшим приоритетом.
+        limit (float): Текущий размер окна.
+        in_flight (int): Количество выполняющихся отправок.
+        latency (float): Сглаженная задержка ответа сервера в секундах.
+        base_latency (float): Базовая (минимальная наблюдаемая) задержка в секундах.
+
+    Методы:
+        acquire(lane=0): Ждёт свободного места в окне для отправки полосы lane.
+        release(results): Освобождает место и пересчитывает размер окна по результатам отправки.
+    """
+
+    LATENCY_SLACK = 0.05
+
+    def __init__(self, min_limit=None, max_limit=None, latency_tolerance=None, backoff=0.5, weights=(), reserved=()):
+        self.max_limit = max_limit or settings.MAILING_CONCURRENCY
+        self.min_limit = min(min_limit or settings.MAILING_MIN_CONCURRENCY, self.max_limit)
+        self.latency_tolerance = latency_tolerance or settings.MAILING_ADAPTIVE_LATENCY_TOLERANCE
+        self.backoff = backoff
+        self.weights = tuple(weights)
+        self.reserved = tuple(reserved)
+        self.limit = float(self.min_limit)
+        self.in_flight = 0
+        self.latency = None
+        self.base_latency = None
+        self._slow_start = True
+        self._decreased_at = 0.0
+        self._waiters = defaultdict(deque)
+        self._credits = defaultdict(int)
+
+    @property
+    def size(self):
+        """
+        Возвращает текущий размер окна в отправках.
+        """
+
+        return int(self.limit)
+
+    def _lane_limit(self, lane):
+        return max(1, self.size - sum(self.reserved[:lane]))
+
+    def _weight(self, lane):
+        return self.weights[lane] if lane < len(self.weights) else 1
+
+    async def acquire(self, lane=0):
+        """
+        Ждёт свободного места в окне для отправки полосы приоритета и занимает его.
+
+        Параметры:
+            lane (int): Полоса приоритета отправки, индекс в LANES.
+        """
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(future)
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                if future in self._waiters[lane]:
+                    self._waiters[lane].remove(future)
+            else:
+                self.in_flight -= 1
+                self._dispatch()
+
+            raise
+
+    def _dispatch(self):
+        while True:
+            ready = sorted(lane for lane, waiters in self._waiters.items()
+                           if waiters and self.in_flight < self._lane_limit(lane))
+
+            if not ready:
+                return
+
+            lane = ready[0]
+
+            if len(ready) > 1:
+                for candidate in ready:
+                    self._credits[candidate] += self._weight(candidate)
+
+                lane = max(ready, key=lambda candidate: self._credits[candidate])
+                self._credits[lane] -= sum(self._weight(candidate) for candidate in ready)
+
+            future = self._waiters[lane].popleft()
+
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    async def release(self, results):
+        """
+        Освобождает место в окне и пересчитывает его размер.
+
+        Параметры:
+            results (list[DeliveryResult]): Результаты отправки, выполненной в занятом месте.
+        """
+
+        self.in_flight -= 1
+        self._update(results)
+        self._dispatch()
+
+    def _update(self, results):
+        previous = self.size
+
+        if results:
+            self._observe_latency(max(result.latency for result in results))
+
+        congested = not results or any(result.transient for result in results)
+        congested = congested or (
+            self.latency is not None and self.latency > self.base_latency * self.latency_tolerance + self.LATENCY_SLACK
+        )
+
+        if congested:
+            now = time.monotonic()
+
+            if now - self._decreased_at >= (self.latency or 0):
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._slow_start = False
+                self._decreased_at = now
+        elif self._slow_start:
+            self.limit = min(self.max_limit, self.limit + 1)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+        if self.size != previous:
+            logger.debug('Окно одновременных отправок: %s -> %s (задержка %.3f с)', previous, self.size,
+                         self.latency or 0)
+
+    def _observe_latency(self, sample):
+        if self.latency is None:
+            self.latency = self.base_latency = sample
+
+            return
+
+        self.latency += (sample - self.latency) * 0.2
+
+        if sample < self.base_latency:
+            self.base_latency = sample
+        else:
+            self.base_latency += (sample - self.base_latency) * 0.01
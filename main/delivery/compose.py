@@ -0,0 +1,110 @@
+from email.utils import make_msgid
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.core.mail.message import sanitize_address
+from django.core.mail.utils import DNS_NAME
+
+from .envelope import LANE_BULK, Envelope
+
+
+class MessagePrototype:
+    """
+    Письмо, заголовки и текст которого сериализованы один раз для всех получателей.
+
+    Кодирование темы и текста (кодировка, перенос строк заголовков, base64/quoted-printable) выполняется при создании
+    прототипа. Для каждого получателя к готовым байтам добавляются только заголовки To и Message-ID.
+
+    Атрибуты:
+        sender (str): Адрес отправителя.
+        head (bytes): Общие заголовки письма.
+        body (bytes): Закодированный текст письма.
+
+    Методы:
+        build_envelope(email, ...): Формирует конверт письма получателю.
+        build_batch_envelope(emails, ...): Формирует конверт письма нескольким получателям.
+    """
+
+    __slots__ = ('sender', 'head', 'body')
+
+    def __init__(self, subject, body):
+        message = EmailMessage(subject=subject, body=body, from_email=settings.EMAIL_HOST_USER).message()
+        del message['Message-ID']
+        self.sender = settings.EMAIL_HOST_USER
+        self.head, _, self.body = message.as_bytes(linesep='\r\n').partition(b'\r\n\r\n')
+
+    def build_envelope(self, email, tag=None, group=None, lane=LANE_BULK, unsubscribe_url=None):
+        """
+        Формирует конверт письма одному получателю.
+
+        Параметры:
+            email (str): Адрес получателя.
+            tag (object): Метка конверта, возвращается вместе с результатами отправки.
+            group (object): Группа конверта для ограничения параллельности.
+            lane (int): Полоса приоритета отправки.
+            unsubscribe_url (str): Ссылка отписки для заголовков List-Unsubscribe и List-Unsubscribe-Post.
+
+        Возвращает:
+            Envelope: Конверт с сериализованным письмом.
+        """
+
+        to = sanitize_address(email, settings.DEFAULT_CHARSET)
+        unsubscribe = (f'\r\nList-Unsubscribe: <{unsubscribe_url}>\r\nList-Unsubscribe-Post: List-Unsubscribe=One-Click'
+                       if unsubscribe_url else '')
+        data = b''.join((
+            self.head,
+            f'\r\nTo: {to}\r\nMessage-ID: {make_msgid(domain=DNS_NAME)}{unsubscribe}\r\n\r\n'.encode(),
+            self.body,
+        ))
+
+        return Envelope(self.sender, [email], data, tag=tag, group=group, lane=lane)
+
+    def build_batch_envelope(self, emails, tag=None, group=None, lane=LANE_BULK, unsubscribe_url=None):
+        """
+        Формирует конверт одного письма нескольким получателям в скрытой копии.
+
+        Адреса получателей передаются только командами RCPT TO, в заголовке To указывается
+        'undisclosed-recipients:;', поэтому получатели не видят друг друга. Ссылка отписки не содержит адреса
+        получателя, поэтому заголовок List-Unsubscribe-Post (отписка в один клик, RFC 8058) не добавляется.
+
+        Параметры:
+            emails (list[str]): Адреса получателей.
+            tag (object): Метка конверта, возвращается вместе с результатами отправки.
+            group (object): Группа конверта для ограничения параллельности.
+            lane (int): Полоса приоритета отправки.
+            unsubscribe_url (str): Ссылка отписки от рассылок владельца для заголовка List-Unsubscribe.
+
+        Возвращает:
+            Envelope: Конверт с сериализованным письмом.
+        """
+
+        unsubscribe = f'\r\nList-Unsubscribe: <{unsubscribe_url}>' if unsubscribe_url else ''
+        data = b''.join((
+            self.head,
+            f'\r\nTo: undisclosed-recipients:;\r\nMessage-ID: {make_msgid(domain=DNS_NAME)}{unsubscribe}\r\n\r\n'
+            .encode(),
+            self.body,
+        ))
+
+        return Envelope(self.sender, list(emails), data, tag=tag, group=group, lane=lane)
+
+
+def build_envelope(mailing, email, tag=None, subject=None, body=None):
+    """
+    Формирует письмо рассылки для одного получателя.
+
+    Параметры:
+        mailing (Mailing): Рассылка, содержимое которой отправляется.
+        email (str): Адрес получателя.
+        tag (object): Метка конверта, возвращается вместе с результатами отправки.
+        subject (str): Тема письма, по умолчанию заголовок рассылки.
+        body (str): Текст письма, по умолчанию текст рассылки.
+
+    Возвращает:
+        Envelope: Конверт с сериализованным письмом, сгруппированный по рассылке.
+    """
+
+    prototype = MessagePrototype(mailing.title if subject is None else subject,
+                                 mailing.message if body is None else body)
+
+    return prototype.build_envelope(email, tag=tag, group=mailing.pk)
@@ -0,0 +1,218 @@
+import asyncio
+import queue
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+from .adaptive import AdaptiveWindow
+from .aiosmtp import AsyncSMTPTransport
+from .envelope import LANES
+from .pool import PooledTransport
+from .ratelimit import RateLimiter
+
+_DONE = object()
+
+
+class DeliveryEngine:
+    """
+    Движок параллельной доставки писем.
+
+    Конверты распределяются между параллельными отправками в собственном цикле asyncio, работающем в фоновом
+    потоке. Количество одновременных отправок ограничено глобально (на весь процесс) и для каждой группы
+    конвертов (рассылки) отдельно, чтобы одна большая рассылка не занимала все соединения. Перед отправкой конверт
+    ждёт разрешения ограничителя темпа; ожидающий конверт не занимает глобальный слот отправки.
+
+    Количество глобальных слотов задаётся адаптивным окном (см. AdaptiveWindow): оно растёт, пока SMTP-сервер
+    отвечает быстро, и сокращается при росте задержки и временных ошибках, но не превышает concurrency. Если
+    настройка MAILING_ADAPTIVE_CONCURRENCY отключена, окно постоянно и равно concurrency.
+
+    Места в окне распределяются между полосами приоритета конвертов (служебные письма, небольшие и крупные рассылки)
+    согласно весам MAILING_LANE_WEIGHTS, а для старших полос резервируется MAILING_LANE_RESERVED мест. Движок
+    может одновременно отправлять конверты нескольких вызовов deliver() из разных потоков, поэтому служебные письма,
+    отправляемые отдельным потоком, обгоняют письма крупной рассылки, уже ожидающие места в окне.
+
+    Атрибуты:
+        transport: Транспорт с асинхронными методами send(envelope), возвращающим список DeliveryResult,
+                   и aclose(). По умолчанию выбирается настройкой MAILING_TRANSPORT.
+        concurrency (int): Максимальное количество одновременных отправок в процессе.
+        window (AdaptiveWindow): Окно одновременных отправок (создаётся при первой отправке).
+        per_group_concurrency (int): Максимальное количество одновременных отправок одной группы (рассылки).
+        limiter (RateLimiter): Ограничитель темпа отправки на релей и домены получателей.
+        lane_weights (tuple[int]): Веса полос приоритета по индексу полосы в LANES.
+        lane_reserved (tuple[int]): Количество мест окна, зарезервированных для каждой полосы.
+
+    Методы:
+        deliver(envelopes): Отправляет конверты и возвращает результаты по мере их получения.
+        close(): Останавливает цикл движка и транспорт.
+
+    Свойства:
+        window_size (int): Текущий размер окна одновременных отправок.
+    """
+
+    def __init__(self, transport=None, concurrency=None, per_group_concurrency=None, limiter=None, lane_weights=None,
+                 lane_reserved=None):
+        self.concurrency = concurrency or settings.MAILING_CONCURRENCY
+        self.per_group_concurrency = per_group_concurrency or settings.MAILING_PER_MAILING_CONCURRENCY
+        self.transport = transport or get_transport(self.concurrency)
+        self.limiter = limiter or RateLimiter()
+        self.lane_weights = lane_weights or tuple(settings.MAILING_LANE_WEIGHTS.get(lane, 1) for lane in LANES)
+        self.lane_reserved = lane_reserved or tuple(settings.MAILING_LANE_RESERVED.get(lane, 0) for lane in LANES)
+        self.window = None
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='delivery-engine', daemon=True)
+                self._thread.start()
+
+            return self._loop
+
+    def deliver(self, envelopes):
+        """
+        Отправляет конверты параллельно и возвращает результаты по мере завершения отправок.
+
+        Генератор выполняется в вызывающем потоке, поэтому обработчик результатов может обращаться к базе данных,
+        пока отправка остальных конвертов продолжается.
+
+        Параметры:
+            envelopes (Iterable[Envelope]): Конверты для отправки.
+
+        Возвращает:
+            Iterator[DeliveryResult]: Результаты отправки по каждому получателю.
+        """
+
+        results = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._deliver(list(envelopes), results.put), self._ensure_loop())
+        future.add_done_callback(lambda _: results.put(_DONE))
+
+        while (item := results.get()) is not _DONE:
+            yield item
+
+        future.result()
+
+    async def _deliver(self, envelopes, emit):
+        if self.window is None:
+            adaptive = settings.MAILING_ADAPTIVE_CONCURRENCY
+            self.window = AdaptiveWindow(min_limit=None if adaptive else self.concurrency,
+                                         max_limit=self.concurrency, weights=self.lane_weights,
+                                         reserved=self.lane_reserved)
+
+        groups = defaultdict(list)
+
+        for envelope in envelopes:
+            groups[envelope.group].append(envelope)
+
+        await asyncio.gather(*(self._feed(batch, emit) for batch in groups.values()))
+
+    async def _feed(self, envelopes, emit):
+        group_slots = asyncio.Semaphore(self.per_group_concurrency)
+        tasks = set()
+
+        for envelope in envelopes:
+            await group_slots.acquire()
+            task = asyncio.create_task(self._send(envelope, group_slots, emit))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _send(self, envelope, group_slots, emit):
+        try:
+            await self.limiter.wait(envelope)
+
+            results = []
+            await self.window.acquire(envelope.lane)
+
+            try:
+                results = await self.transport.send(envelope)
+            finally:
+                await self.window.release(results)
+
+            for result in results:
+                emit(result)
+        finally:
+            group_slots.release()
+
+    @property
+    def window_size(self):
+        """
+        Возвращает текущий размер окна одновременных отправок.
+        """
+
+        return self.concurrency if self.window is None else self.window.size
+
+    def close(self):
+        """
+        Закрывает транспорт и останавливает цикл движка.
+        """
+
+        with self._lock:
+            if self._loop is None:
+                asyncio.run(self.transport.aclose())
+
+                return
+
+            asyncio.run_coroutine_threadsafe(self.transport.aclose(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self.window = None
+
+
+def get_transport(workers):
+    """
+    Создаёт транспорт движка доставки согласно настройке MAILING_TRANSPORT.
+
+    Параметры:
+        workers (int): Количество потоков для блокирующего транспорта.
+
+    Возвращает:
+        AsyncSMTPTransport | PooledTransport: Асинхронный транспорт для значения 'asyncio', иначе транспорт
+                                              поверх пула блокирующих соединений.
+    """
+
+    if settings.MAILING_TRANSPORT == 'asyncio':
+        return AsyncSMTPTransport()
+
+    return PooledTransport(workers=workers)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_delivery_engine():
+    """
+    Возвращает общий для процесса движок доставки, создавая его при первом обращении.
+
+    Возвращает:
+        DeliveryEngine: Движок доставки с ограничениями параллельности из настроек проекта.
+    """
+
+    global _engine
+
+    with _engine_lock:
+        if _engine is None:
+            _engine = DeliveryEngine()
+
+        return _engine
+
+
+def close_delivery_engine():
+    """
+    Останавливает общий движок доставки процесса, если он был создан.
+    """
+
+    global _engine
+
+    with _engine_lock:
+        if _engine is not None:
+            _engine.close()
+            _engine = None
@@ -0,0 +1,101 @@
+LANES = ('transactional', 'small', 'bulk')
+
+LANE_TRANSACTIONAL, LANE_SMALL, LANE_BULK = range(len(LANES))
+
+STAGE_CONNECT, STAGE_MAIL, STAGE_RCPT, STAGE_DATA = 'connect', 'mail', 'rcpt', 'data'
+
+MAILBOX_REJECTION_CODES = (550, 551, 553)
+
+
+class Envelope:
+    """
+    Готовое к отправке письмо: SMTP-конверт и сериализованное содержимое.
+
+    Атрибуты:
+        sender (str): Адрес отправителя (MAIL FROM).
+        recipients (list): Список адресов получателей (RCPT TO).
+        data (bytes): Письмо целиком в виде байтов с переводами строк CRLF.
+        tag (object): Произвольная метка вызывающего кода, возвращается вместе с результатами отправки.
+        group (object): Ключ группы, в пределах которой ограничивается параллельность отправки (обычно id рассылки).
+        lane (int): Полоса приоритета отправки, индекс в LANES (служебные письма, небольшие или крупные рассылки).
+    """
+
+    __slots__ = ('sender', 'recipients', 'data', 'tag', 'group', 'lane')
+
+    def __init__(self, sender, recipients, data, tag=None, group=None, lane=LANE_BULK):
+        self.sender = sender
+        self.recipients = list(recipients)
+        self.data = data
+        self.tag = tag
+        self.group = group
+        self.lane = lane
+
+    def __repr__(self):
+        return f'<Envelope {self.sender} -> {", ".join(self.recipients)}>'
+
+
+class DeliveryResult:
+    """
+    Результат отправки письма одному получателю.
+
+    Атрибуты:
+        envelope (Envelope): Конверт, в составе которого отправлялось письмо.
+        recipient (str): Адрес получателя.
+        code (int): Код ответа SMTP-сервера, None если ответ не был получен (обрыв соединения, таймаут).
+        message (str): Текст ответа сервера или описание ошибки.
+        latency (float): Время отправки конверта в секундах.
+        stage (str): Этап SMTP-сессии, к которому относится ответ: подключение и авторизация (STAGE_CONNECT),
+                     MAIL FROM (STAGE_MAIL), RCPT TO (STAGE_RCPT) или передача письма (STAGE_DATA).
+
+    Свойства:
+        ok: Письмо принято сервером (код 2xx).
+        session_failed: Ошибка относится ко всей SMTP-сессии (подключение, авторизация или MAIL FROM), а не к письму
+                        или получателю: сервер недоступен, отклонил учётные данные или адрес отправителя.
+        transient: Временная ошибка (код 4xx, отсутствие ответа или ошибка сессии с любым кодом), отправку имеет
+                   смысл повторить.
+        permanent: Постоянная ошибка (код 5xx в ответ на RCPT TO или DATA), повторная отправка бессмысленна.
+        mailbox_rejected: Сервер отклонил адрес получателя: постоянная ошибка на команду RCPT TO с кодом 550, 551
+                          или 553 либо с расширенным статусом 5.1.x. Ошибки подключения, авторизации, MAIL FROM
+                          и DATA относятся ко всему письму или сессии, а не к адресу.
+    """
+
+    __slots__ = ('envelope', 'recipient', 'code', 'message', 'latency', 'stage')
+
+    def __init__(self, envelope, recipient, code, message='', latency=0.0, stage=STAGE_DATA):
+        self.envelope = envelope
+        self.recipient = recipient
+        self.code = code
+        self.message = message
+        self.latency = latency
+        self.stage = stage
+
+    def __repr__(self):
+        return f'<DeliveryResult {self.recipient}: {self.code} {self.message}>'
+
+    @property
+    def ok(self):
+        return self.code is not None and 200 <= self.code < 300
+
+    @property
+    def session_failed(self):
+        return self.stage in (STAGE_CONNECT, STAGE_MAIL) and not self.ok
+
+    @property
+    def transient(self):
+        return self.code is None or 400 <= self.code < 500 or self.session_failed
+
+    @property
+    def permanent(self):
+        return self.code is not None and self.code >= 500 and not self.session_failed
+
+    @property
+    def mailbox_rejected(self):
+        if self.stage != STAGE_RCPT or not self.permanent:
+            return False
+
+        status = self.message.split(' ', 1)[0]
+
+        if status.count('.') == 2 and status.replace('.', '').isdigit():
+            return status.startswith('5.1.')
+
+        return self.code in MAILBOX_REJECTION_CODES
@@ -0,0 +1,282 @@
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import sanitize_address
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..metrics import registry
+from ..models import QueuedEmail
+from ..notifications import notify_schedule_changed
+from .engine import get_delivery_engine
+from .envelope import LANE_TRANSACTIONAL, Envelope
+from .outbox import get_retry_delay, get_worker_id
+from .writer import delete_in_batches
+
+logger = logging.getLogger(__name__)
+
+GROUP = 'transactional'
+
+wakeup = threading.Event()
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """
+    Почтовый бэкенд Django, который ставит письма в очередь служебных писем вместо отправки.
+
+    Письмо сериализуется и сохраняется в модели QueuedEmail в текущей транзакции, после её фиксации планировщик
+    рассылок будится уведомлением (см. notify_schedule_changed) и отправляет письмо через движок доставки
+    (см. process_queued_emails). Поэтому send_mail() возвращается сразу, без обмена с SMTP-сервером, а письмо
+    не теряется при недоступности сервера и не отправляется, если транзакция откатилась.
+
+    Использование:
+        EMAIL_BACKEND = 'main.delivery.mailqueue.QueuedEmailBackend'
+    """
+
+    def send_messages(self, email_messages):
+        """
+        Ставит письма в очередь служебных писем.
+
+        Параметры:
+            email_messages (list[EmailMessage]): Письма Django.
+
+        Возвращает:
+            int: Количество поставленных в очередь писем.
+        """
+
+        emails = []
+
+        for message in email_messages:
+            recipients = message.recipients()
+
+            if not recipients:
+                continue
+
+            encoding = message.encoding or settings.DEFAULT_CHARSET
+            emails.append(QueuedEmail(
+                sender=sanitize_address(message.from_email, encoding),
+                recipients=[sanitize_address(recipient, encoding) for recipient in recipients],
+                data=message.message().as_bytes(linesep='\r\n'),
+            ))
+
+        if not emails:
+            return 0
+
+        try:
+            QueuedEmail.objects.bulk_create(emails)
+            notify_schedule_changed()
+        except DatabaseError:
+            if not self.fail_silently:
+                raise
+
+            logger.exception('Не удалось поставить в очередь %s служебных писем', len(emails))
+
+            return 0
+
+        for email in emails:
+            logger.info('Служебное письмо %s для %s поставлено в очередь', email.pk, ', '.join(email.recipients))
+
+        return len(emails)
+
+
+def claim_queued_emails(worker_id, limit=None, lease=None):
+    """
+    Забирает пачку служебных писем из очереди в аренду обработчику.
+
+    Выбираются новые письма, время отправки которых наступило, и письма, аренда которых истекла. Строки блокируются
+    через SELECT ... FOR UPDATE SKIP LOCKED, поэтому параллельные обработчики получают непересекающиеся пачки.
+
+    Параметры:
+        worker_id (str): Идентификатор обработчика.
+        limit (int): Максимальный размер пачки, по умолчанию MAILING_OUTBOX_BATCH_SIZE.
+        lease (int): Длительность аренды в секундах, по умолчанию MAILING_OUTBOX_LEASE.
+
+    Возвращает:
+        list[QueuedEmail]: Письма пачки.
+    """
+
+    now = timezone.now()
+    limit = limit or settings.MAILING_OUTBOX_BATCH_SIZE
+    expires = now + timedelta(seconds=lease or settings.MAILING_OUTBOX_LEASE)
+
+    with transaction.atomic():
+        emails = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='Новый', next_attempt_at__lte=now) | Q(status='Отправка', lease_expires__lt=now))
+            .order_by('pk')[:limit]
+        )
+
+        if not emails:
+            return []
+
+        QueuedEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+            status='Отправка', lease_owner=worker_id, lease_expires=expires)
+
+    return emails
+
+
+def deliver_queued_emails(emails, engine=None):
+    """
+    Отправляет пачку служебных писем и записывает результаты.
+
+    Доставленное всем получателям письмо получает статус 'Отправлен'. Если часть получателей ответила временной
+    ошибкой (код 4xx или обрыв соединения), письмо возвращается в очередь только для них и отправляется повторно
+    после паузы (см. get_retry_delay), пока не будет исчерпано MAILING_RETRY_MAX_ATTEMPTS попыток; иначе письмо
+    получает статус 'Отклонен'. Конверты отправляются в полосе приоритета служебных писем.
+
+    Параметры:
+        emails (list[QueuedEmail]): Письма, полученные через claim_queued_emails().
+        engine (DeliveryEngine): Движок доставки, по умолчанию общий движок процесса.
+    """
+
+    envelopes = [Envelope(email.sender, email.recipients, bytes(email.data), tag=email, group=GROUP,
+                          lane=LANE_TRANSACTIONAL) for email in emails]
+    results = defaultdict(list)
+
+    for result in (engine or get_delivery_engine()).deliver(envelopes):
+        results[result.envelope.tag].append(result)
+
+    now = timezone.now()
+
+    for email in emails:
+        _record_result(email, results[email], now)
+
+    QueuedEmail.objects.bulk_update(emails, ['status', 'recipients', 'attempts', 'next_attempt_at', 'log_message',
+                                             'lease_owner', 'lease_expires'])
+
+
+def _record_result(email, results, now):
+    email.attempts += 1
+    email.lease_owner = email.lease_expires = None
+    deferred = [result.recipient for result in results if result.transient]
+    failures = [f'{result.recipient}: {result.code} {result.message}' for result in results if not result.ok]
+
+    for result in results:
+        status = 'sent' if result.ok else 'deferred' if result.transient else 'rejected'
+        registry.inc('mailing_transactional_total', status=status)
+
+    if not failures:
+        email.status = 'Отправлен'
+        email.log_message = 'Успешная отправка'
+        registry.observe('mailing_transactional_delay_seconds', (now - email.created_at).total_seconds())
+        logger.info('Служебное письмо %s отправлено: %s', email.pk, ', '.join(email.recipients))
+
+        return
+
+    email.log_message = '; '.join(failures)
+
+    if deferred and email.attempts < settings.MAILING_RETRY_MAX_ATTEMPTS:
+        delay = get_retry_delay(email.attempts)
+        email.status = 'Новый'
+        email.recipients = deferred
+        email.next_attempt_at = now + timedelta(seconds=delay)
+        logger.warning('Служебное письмо %s не доставлено (%s), повтор через %.0f с', email.pk, email.log_message,
+                       delay)
+    else:
+        email.status = 'Отклонен'
+        logger.error('Служебное письмо %s отклонено: %s', email.pk, email.log_message)
+
+
+def process_queued_emails(worker_id=None, engine=None, stop_event=None):
+    """
+    Отправляет служебные письма из очереди, пока в ней остаются доступные для аренды письма.
+
+    Параметры:
+        worker_id (str): Идентификатор обработчика, по умолчанию идентификатор текущего процесса.
+        engine (DeliveryEngine): Движок доставки, по умолчанию общий движок процесса.
+        stop_event (threading.Event): Событие остановки: после его установки новые пачки не забираются.
+
+    Возвращает:
+        int: Количество обработанных писем.
+    """
+
+    worker_id = worker_id or get_worker_id()
+    processed = 0
+
+    while not (stop_event and stop_event.is_set()):
+        emails = claim_queued_emails(worker_id)
+
+        if not emails:
+            break
+
+        deliver_queued_emails(emails, engine)
+        processed += len(emails)
+
+    return processed
+
+
+def purge_queued_emails(days=None, batch_size=None):
+    """
+    Удаляет из очереди служебные письма со статусом 'Отправлен' или 'Отклонен', поставленные в очередь раньше чем
+    MAILING_QUEUED_EMAIL_RETENTION_DAYS дней назад.
+
+    Параметры:
+        days (int): Срок хранения обработанных писем в днях, по умолчанию MAILING_QUEUED_EMAIL_RETENTION_DAYS.
+        batch_size (int): Количество писем, удаляемых одним запросом, по умолчанию MAILING_PURGE_BATCH_SIZE.
+
+    Возвращает:
+        int: Количество удалённых писем.
+    """
+
+    cutoff = timezone.now() - timedelta(days=days or settings.MAILING_QUEUED_EMAIL_RETENTION_DAYS)
+    finished = QueuedEmail.objects.filter(status__in=['Отправлен', 'Отклонен'], created_at__lt=cutoff)
+    deleted = delete_in_batches(finished, batch_size)
+
+    if deleted:
+        logger.info('Из очереди удалено %s обработанных служебных писем старше %s', deleted, cutoff)
+
+    return deleted
+
+
+def run_transactional_lane(stop_event, interval=None):
+    """
+    Отправляет служебные письма в отдельном потоке, пока не установлено событие остановки.
+
+    Служебные письма отправляются независимо от рассылок, через тот же движок доставки в полосе приоритета
+    служебных писем, поэтому не ждут окончания отправки пачки крупной рассылки. Очередь проверяется сразу после
+    установки события wakeup (уведомление о новом письме, см. notify_schedule_changed), а без уведомлений - раз
+    в MAILING_TRANSACTIONAL_POLL_INTERVAL секунд, чтобы подобрать повторные отправки и письма с истёкшей арендой,
+    не нагружая базу данных частым опросом.
+
+    Параметры:
+        stop_event (threading.Event): Событие остановки.
+        interval (float): Пауза между проверками очереди в секундах.
+    """
+
+    interval = interval or settings.MAILING_TRANSACTIONAL_POLL_INTERVAL
+
+    while not stop_event.is_set():
+        close_old_connections()
+
+        try:
+            process_queued_emails(stop_event=stop_event)
+        except Exception:
+            logger.exception('Ошибка отправки служебных писем')
+
+        wakeup.wait(interval)
+        wakeup.clear()
+
+    connection.close()
+
+
+def start_transactional_lane(stop_event):
+    """
+    Запускает поток отправки служебных писем (см. run_transactional_lane).
+
+    Параметры:
+        stop_event (threading.Event): Событие остановки потока.
+
+    Возвращает:
+        threading.Thread: Запущенный поток.
+    """
+
+    thread = threading.Thread(target=run_transactional_lane, args=(stop_event,), name='transactional-lane',
+                              daemon=True)
+    thread.start()
+
+    return thread
@@ -0,0 +1,606 @@
+import heapq
+import logging
+import os
+import random
+import socket
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from ..metrics import registry
+from ..models import Client, Mailing, MailingAttempt, OutboxMessage, SuppressedAddress
+from ..profiling import active, stage
+from .compose import MessagePrototype
+from .engine import get_delivery_engine
+from .envelope import LANE_BULK, LANE_SMALL
+from .recipients import iter_mailing_client_ids
+from .suppression import get_unsubscribe_url, suppress_addresses, suppression_list
+from .templating import get_message_template
+from .writer import BufferedUpdater, BufferedWriter, delete_in_batches
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+
+def get_worker_id():
+    """
+    Возвращает идентификатор текущего процесса-обработчика очереди.
+
+    Возвращает:
+        str: Идентификатор в формате 'хост:pid'.
+    """
+
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def materialize_due_mailings(current_datetime, owns=None):
+    """
+    Создаёт записи очереди для всех рассылок, время отправки которых наступило, и переносит их на следующий период.
+
+    Рассылки блокируются на время постановки в очередь, поэтому параллельно работающие планировщики не создадут
+    записи дважды; повторная постановка того же запуска исключается ограничением уникальности. Клиенты всех рассылок
+    перебираются кусками по идентификаторам и сливаются в порядке идентификатора клиента: письма разных рассылок
+    одному клиенту попадают в очередь рядом, в одну пачку обработчика, и одинаковые письма объединяются при
+    отправке (см. deliver_messages). Расход памяти не зависит от размера аудитории. Письма рассылок не больше чем
+    на MAILING_SMALL_MAILING_SIZE получателей ставятся в полосу приоритета небольших рассылок, остальные - в полосу
+    крупных рассылок.
+
+    Письма получают виртуальное время справедливой очереди (weighted fair queuing) по владельцам рассылок: письма
+    владельца нумеруются с шагом 1 / mailing_weight, начиная после последнего неотправленного письма этого владельца,
+    но не раньше текущего виртуального времени очереди (наименьшего времени писем, ещё не забранных на отправку).
+    Обработчики забирают письма в порядке виртуального времени, поэтому рассылки разных владельцев отправляются
+    вперемешку пропорционально их весам, и крупная рассылка одного владельца не задерживает рассылки остальных.
+
+    Если задана функция owns, в очередь ставятся только рассылки, которые она относит к текущему узлу кластера
+    (см. main.sharding); рассылки других узлов не блокируются.
+
+    Параметры:
+        current_datetime (datetime): Текущее время, от которого отсчитывается следующий период.
+        owns (callable): Функция, проверяющая по идентификатору рассылки, что она принадлежит текущему узлу.
+
+    Возвращает:
+        int: Количество рассылок, поставленных в очередь.
+    """
+
+    due = Mailing.objects.filter(status__in=Mailing.ACTIVE_STATUSES, scheduled_time__lte=current_datetime)
+
+    if owns is not None:
+        with stage('due_query'):
+            due = due.filter(pk__in=[pk for pk in due.values_list('pk', flat=True) if owns(pk)])
+
+    with transaction.atomic():
+        with stage('due_query'):
+            mailings = list(due.select_for_update(skip_locked=True).order_by('pk'))
+
+        if not mailings:
+            return 0
+
+        lanes = {mailing.pk: _get_lane(mailing) for mailing in mailings}
+        fair_keys = _get_fair_keys({mailing.owner_id for mailing in mailings})
+        written = Counter()
+        recipients = heapq.merge(*(_iter_recipients(mailing) for mailing in mailings), key=itemgetter(0))
+
+        with stage('materialize'), BufferedWriter(OutboxMessage, flush_interval=float('inf'),
+                                                  ignore_conflicts=True) as outbox:
+            for client_id, mailing in recipients:
+                fair_key = fair_keys[mailing.owner_id]
+                outbox.add(OutboxMessage(mailing_id=mailing.pk, client_id=client_id, run_time=mailing.scheduled_time,
+                                         lane=lanes[mailing.pk], fair_key=fair_key[0]))
+                fair_key[0] += fair_key[1]
+                written[mailing.pk] += 1
+
+        for mailing in mailings:
+            mailing.scheduled_time = mailing.get_next_scheduled_time(current_datetime)
+            update_fields = ['scheduled_time']
+
+            if not written[mailing.pk]:
+                mailing.status = 'Отправлен'
+                update_fields.append('status')
+
+            with stage('reschedule', mailing.pk):
+                mailing.save(update_fields=update_fields)
+
+            logger.info('Рассылка %s поставлена в очередь: %s писем', mailing.pk, written[mailing.pk])
+
+    return len(mailings)
+
+
+def _get_lane(mailing):
+    through = Mailing.clients.through.objects.filter(mailing_id=mailing.pk)
+
+    return LANE_BULK if through[settings.MAILING_SMALL_MAILING_SIZE:].exists() else LANE_SMALL
+
+
+def _get_fair_keys(owners):
+    pending = OutboxMessage.objects.filter(status__in=['Новый', 'Отправка'])
+    virtual_time = (pending.filter(status='Новый', attempts=0)
+                    .aggregate(virtual_time=Min('fair_key'))['virtual_time'] or 0.0)
+    last_keys = dict(pending.filter(mailing__owner__in=owners)
+                     .values_list('mailing__owner')
+                     .annotate(last_key=Max('fair_key')))
+    weights = dict(User.objects.filter(pk__in=owners).values_list('pk', 'mailing_weight'))
+    fair_keys = {}
+
+    for owner in owners:
+        step = 1.0 / max(1, weights.get(owner, 1))
+        fair_keys[owner] = [max(virtual_time, last_keys.get(owner, virtual_time)) + step, step]
+
+    return fair_keys
+
+
+def _iter_recipients(mailing):
+    for client_id in iter_mailing_client_ids(mailing):
+        yield client_id, mailing
+
+
+def claim_messages(worker_id, limit=None, lease=None):
+    """
+    Забирает пачку писем из очереди в аренду обработчику.
+
+    Выбираются новые письма, время повторной отправки которых наступило, и письма, аренда которых истекла.
+    Строки блокируются через SELECT ... FOR UPDATE
+    SKIP LOCKED, поэтому параллельные обработчики получают непересекающиеся пачки и не ждут друг друга.
+    Письма рассылок со статусом 'Отклонен' не выбираются. Письма небольших рассылок выбираются раньше писем крупных,
+    в пределах полосы приоритета - в порядке виртуального времени справедливой очереди владельцев.
+
+    Параметры:
+        worker_id (str): Идентификатор обработчика.
+        limit (int): Максимальный размер пачки, по умолчанию MAILING_OUTBOX_BATCH_SIZE.
+        lease (int): Длительность аренды в секундах, по умолчанию MAILING_OUTBOX_LEASE.
+
+    Возвращает:
+        list[OutboxMessage]: Письма пачки; из связанного клиента загружается только адрес.
+    """
+
+    now = timezone.now()
+    limit = limit or settings.MAILING_OUTBOX_BATCH_SIZE
+    expires = now + timedelta(seconds=lease or settings.MAILING_OUTBOX_LEASE)
+
+    with transaction.atomic():
+        ids = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(Q(status='Новый', next_attempt_at__isnull=True) | Q(status='Новый', next_attempt_at__lte=now)
+                    | Q(status='Отправка', lease_expires__lt=now))
+            .exclude(mailing__status='Отклонен')
+            .order_by('lane', 'fair_key', 'pk')
+            .values_list('pk', flat=True)[:limit]
+        )
+
+        if not ids:
+            return []
+
+        OutboxMessage.objects.filter(pk__in=ids).update(status='Отправка', lease_owner=worker_id,
+                                                        lease_expires=expires)
+
+    return list(OutboxMessage.objects.filter(pk__in=ids)
+                .select_related('client')
+                .only('mailing', 'run_time', 'attempts', 'next_attempt_at', 'lane', 'client__email'))
+
+
+def get_retry_delay(attempt):
+    """
+    Вычисляет паузу перед повторной отправкой письма.
+
+    Пауза растёт экспоненциально от MAILING_RETRY_BASE_DELAY до MAILING_RETRY_MAX_DELAY, а её вторая половина
+    выбирается случайно, чтобы повторы писем, отклонённых одновременно, не приходились на один момент.
+
+    Параметры:
+        attempt (int): Номер выполненной попытки, начиная с 1.
+
+    Возвращает:
+        float: Пауза в секундах.
+    """
+
+    delay = min(settings.MAILING_RETRY_MAX_DELAY, settings.MAILING_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def deliver_messages(messages, engine=None, worker_id=None):
+    """
+    Отправляет пачку писем очереди и записывает результаты.
+
+    Для каждого письма создаётся попытка отправки. Доставленные письма получают статус 'Отправлен', письма
+    с постоянной ошибкой (код 5xx в ответ на RCPT TO или DATA) - 'Отклонен'. Письма с временной ошибкой (код 4xx,
+    обрыв соединения или отказ сервера в сессии: подключение, авторизация, MAIL FROM) возвращаются в очередь
+    со статусом 'Новый' и отправляются повторно после паузы (см. get_retry_delay), пока не будет исчерпано
+    MAILING_RETRY_MAX_ATTEMPTS попыток. Затем завершённые запуски рассылок получают итоговый статус.
+
+    Тема и текст рассылки с флагом is_template отрисовываются как шаблоны (см. get_message_template) с полями клиента,
+    причём из базы данных загружаются только поля, на которые ссылаются шаблоны. Письмо с одинаковыми темой и текстом
+    кодируется один раз (см. MessagePrototype), для каждого получателя меняются только заголовки To и Message-ID.
+    Рассылки с пакетной отправкой без полей клиента отправляются одним письмом группам до MAILING_BATCH_RECIPIENTS
+    получателей одного домена; результат записывается по каждому получателю согласно ответу сервера на его команду
+    RCPT TO. Одинаковые письма одному получателю (совпадают адрес, тема и текст), например из нескольких рассылок одного
+    владельца, запущенных одновременно, отправляются один раз, а результат записывается для каждого из них. Конверты
+    упорядочиваются по домену получателя, чтобы письма одному почтовому серверу шли подряд через общие соединения.
+    Конверт отправляется в полосе приоритета рассылки (небольшой или крупной, см. OutboxMessage.lane).
+
+    Письма получателям из списка подавления (см. SuppressionList) не отправляются и сразу получают статус 'Отклонен'.
+    Адреса, которые сервер отклонил в ответ на команду RCPT TO как несуществующие (см. DeliveryResult.mailbox_rejected),
+    добавляются в общий список подавления; ошибки подключения, авторизации, MAIL FROM и DATA относятся ко всему письму
+    и список не пополняют. Письма содержат заголовок List-Unsubscribe со ссылкой отписки от рассылок владельца:
+    письма каждому получателю - с личной ссылкой и отпиской в один клик, письма пакетной отправки - со ссылкой
+    без адреса получателя.
+    Если шаблон рассылки не удаётся скомпилировать или отрисовать, статус 'Отклонен' получают только письма этой
+    рассылки (или этого получателя), остальные письма пачки отправляются.
+
+    Статусы писем сохраняются по мере получения результатов, не реже чем раз в MAILING_CHECKPOINT_INTERVAL секунд.
+    Если процесс аварийно завершится посреди пачки, после истечения аренды другой обработчик отправит только письма
+    без сохранённого результата, а не всю пачку заново. Пока пачка отправляется, аренда её писем продлевается каждую
+    треть MAILING_OUTBOX_LEASE, поэтому медленная пачка не забирается повторно другим обработчиком. Статусы
+    сохраняются только для писем, аренда которых всё ещё принадлежит обработчику.
+
+    Параметры:
+        messages (list[OutboxMessage]): Письма, полученные через claim_messages().
+        engine (DeliveryEngine): Движок доставки, по умолчанию общий движок процесса.
+        worker_id (str): Идентификатор обработчика, забравшего письма, по умолчанию идентификатор текущего процесса.
+
+    Возвращает:
+        bool: True, если SMTP-сервер отказал в сессии при отправке всех конвертов пачки (см.
+              DeliveryResult.session_failed).
+    """
+
+    worker_id = worker_id or get_worker_id()
+
+    with stage('fetch'):
+        mailings = (Mailing.objects.only('title', 'message', 'is_template', 'batch_delivery', 'owner')
+                    .in_bulk({message.mailing_id for message in messages}))
+        messages = [message for message in messages if message.mailing_id in mailings]
+        suppression_list.refresh()
+        templates, broken = _get_templates(mailings)
+        clients = _load_template_clients(messages, templates)
+
+    profile = active()
+    rendered = {}
+    deliveries = {}
+    skipped = []
+
+    for message in messages:
+        started = profile and time.perf_counter()
+        mailing = mailings[message.mailing_id]
+        template = templates.get(message.mailing_id)
+
+        if mailing.pk in broken:
+            skipped.append((message, broken[mailing.pk], 'template_error'))
+            continue
+
+        if suppression_list.is_suppressed(message.client.email, mailing.owner_id):
+            skipped.append((message, f'Адрес {message.client.email} в списке подавления', 'suppressed'))
+            continue
+
+        try:
+            if template is None:
+                subject, body = mailing.title, mailing.message
+            elif template.personalized:
+                subject, body = template.render(clients[message.client_id])
+            else:
+                if mailing.pk not in rendered:
+                    rendered[mailing.pk] = template.render(None)
+
+                subject, body = rendered[mailing.pk]
+        except Exception as e:
+            logger.exception('Не удалось отрисовать письмо рассылки %s для %s', mailing.pk, message.client.email)
+            skipped.append((message, f'Ошибка шаблона рассылки для {message.client.email}: {e}', 'template_error'))
+            continue
+
+        key = (message.client.email.lower(), mailing.owner_id, subject, body)
+
+        if key in deliveries:
+            deliveries[key][3].append(message)
+        else:
+            batch = mailing.batch_delivery and not (template is not None and template.personalized)
+            deliveries[key] = (message.client.email, mailing.pk, batch, [message])
+
+        if profile:
+            profile.add('render', time.perf_counter() - started, mailing.pk)
+
+    with stage('encode'):
+        envelopes = _build_envelopes(deliveries)
+    now = timezone.now()
+    attempts = BufferedWriter(MailingAttempt)
+    checkpoint = BufferedUpdater(OutboxMessage, ['status', 'attempts', 'next_attempt_at', 'lease_owner',
+                                                 'lease_expires'],
+                                 batch_size=settings.MAILING_CHECKPOINT_SIZE,
+                                 flush_interval=settings.MAILING_CHECKPOINT_INTERVAL,
+                                 queryset=OutboxMessage.objects.filter(lease_owner=worker_id))
+    bounces = []
+    delivered = session_failures = 0
+    renewed_at = time.monotonic()
+
+    with attempts, checkpoint:
+        for message, log_message, status in skipped:
+            _record_skipped(message, log_message, status, attempts)
+            checkpoint.add(message)
+
+        engine = engine or get_delivery_engine()
+        results = engine.deliver(envelopes)
+
+        while True:
+            if time.monotonic() - renewed_at >= settings.MAILING_OUTBOX_LEASE / 3:
+                _renew_lease(messages, worker_id)
+                renewed_at = time.monotonic()
+
+            with stage('smtp'):
+                result = next(results, None)
+
+            if result is None:
+                break
+
+            if profile:
+                profile.add('smtp_latency', result.latency, result.envelope.group, total=False)
+
+            _record_metrics(result)
+            delivered += 1
+            session_failures += result.session_failed
+
+            if result.mailbox_rejected:
+                bounces.append(SuppressedAddress(email=result.recipient, reason='bounce',
+                                                 log_message=f'{result.code} {result.message}'))
+
+            for message in result.envelope.tag[result.recipient]:
+                _record_result(message, result, now, attempts)
+                checkpoint.add(message)
+
+    suppress_addresses(bounces)
+    registry.set('mailing_concurrency_window', engine.window_size, worker=worker_id)
+
+    with stage('finalize'):
+        finalize_runs({(message.mailing_id, message.run_time) for message in messages})
+
+    return delivered > 0 and session_failures == delivered
+
+
+def _renew_lease(messages, worker_id):
+    expires = timezone.now() + timedelta(seconds=settings.MAILING_OUTBOX_LEASE)
+    renewed = (OutboxMessage.objects
+               .filter(pk__in=[message.pk for message in messages], status='Отправка', lease_owner=worker_id)
+               .update(lease_expires=expires))
+    logger.debug('Аренда %s писем обработчика %s продлена до %s', renewed, worker_id, expires)
+
+
+def _get_domain(email):
+    return email.rpartition('@')[2].lower()
+
+
+def _build_envelopes(deliveries):
+    prototypes = {}
+    envelopes = []
+    batches = defaultdict(list)
+
+    for (_, owner, subject, body), (email, group, batch, messages) in deliveries.items():
+        if (subject, body) not in prototypes:
+            prototypes[subject, body] = MessagePrototype(subject, body)
+
+        if batch:
+            batches[subject, body, owner, group, _get_domain(email)].append((email, messages))
+        else:
+            envelopes.append(prototypes[subject, body].build_envelope(
+                email, tag={email: messages}, group=group, lane=_get_envelope_lane({email: messages}),
+                unsubscribe_url=get_unsubscribe_url(owner, email)))
+
+    size = settings.MAILING_BATCH_RECIPIENTS
+
+    for (subject, body, owner, group, _), recipients in batches.items():
+        unsubscribe_url = get_unsubscribe_url(owner)
+
+        for start in range(0, len(recipients), size):
+            tag = dict(recipients[start:start + size])
+            envelopes.append(prototypes[subject, body].build_batch_envelope(
+                tag, tag=tag, group=group, lane=_get_envelope_lane(tag), unsubscribe_url=unsubscribe_url))
+
+    envelopes.sort(key=lambda envelope: _get_domain(envelope.recipients[0]))
+
+    return envelopes
+
+
+def _get_envelope_lane(tag):
+    return min(message.lane for messages in tag.values() for message in messages)
+
+
+def _get_templates(mailings):
+    templates = {}
+    broken = {}
+
+    for mailing_id, mailing in mailings.items():
+        try:
+            templates[mailing_id] = get_message_template(mailing)
+        except Exception as e:
+            logger.exception('Не удалось скомпилировать шаблон рассылки %s', mailing_id)
+            broken[mailing_id] = f'Ошибка шаблона рассылки: {e}'
+
+    return templates, broken
+
+
+def _load_template_clients(messages, templates):
+    fields = {field for template in templates.values() if template is not None for field in template.fields}
+
+    if not fields:
+        return {}
+
+    ids = {message.client_id for message in messages
+           if templates.get(message.mailing_id) is not None and templates[message.mailing_id].personalized}
+
+    return Client.objects.only(*fields).in_bulk(ids)
+
+
+def _record_metrics(result):
+    status = 'sent' if result.ok else 'deferred' if result.transient else 'rejected'
+    registry.inc('mailing_messages_total', status=status, code=result.code or 'none')
+    registry.observe('mailing_smtp_latency_seconds', result.latency)
+
+
+def _record_skipped(message, log_message, status, attempts):
+    message.status = 'Отклонен'
+    message.lease_owner = message.lease_expires = None
+    attempts.add(MailingAttempt(mailing_id=message.mailing_id, status='Отклонен', log_message=log_message))
+    registry.inc('mailing_messages_total', status=status, code='none')
+
+
+def _record_result(message, result, now, attempts):
+    message.attempts += 1
+    message.lease_owner = message.lease_expires = None
+
+    if result.ok:
+        message.status = 'Отправлен'
+        attempts.add(MailingAttempt(mailing_id=message.mailing_id, status='Отправлен',
+                                    log_message=f'Успешная отправка на {result.recipient}'))
+
+        return
+
+    log_message = f'Ошибка отправки на {result.recipient}: {result.code} {result.message}'
+
+    if result.transient and message.attempts < settings.MAILING_RETRY_MAX_ATTEMPTS:
+        delay = get_retry_delay(message.attempts)
+        message.status = 'Новый'
+        message.next_attempt_at = now + timedelta(seconds=delay)
+        log_message += f' (повтор через {delay:.0f} с)'
+    else:
+        message.status = 'Отклонен'
+
+    attempts.add(MailingAttempt(mailing_id=message.mailing_id, status='Отклонен', log_message=log_message))
+
+
+def finalize_runs(runs):
+    """
+    Устанавливает статус 'Отправлен' рассылкам, все письма запуска которых обработаны.
+
+    Недоставленные письма не влияют на статус рассылки: они отражаются в попытках отправки и в очереди, а следующие
+    запуски рассылки выполняются по расписанию. Статус рассылки, отключённой во время отправки, не меняется.
+
+    Параметры:
+        runs (Iterable[tuple]): Пары (идентификатор рассылки, время запуска).
+    """
+
+    for mailing_id, run_time in runs:
+        if OutboxMessage.objects.filter(mailing_id=mailing_id, run_time=run_time,
+                                        status__in=['Новый', 'Отправка']).exists():
+            continue
+
+        Mailing.objects.filter(pk=mailing_id).exclude(status='Отклонен').update(status='Отправлен')
+
+
+def purge_finished_messages(days=None, batch_size=None):
+    """
+    Удаляет из очереди обработанные письма (со статусом 'Отправлен' или 'Отклонен') запусков рассылок старше
+    MAILING_OUTBOX_RETENTION_DAYS дней.
+
+    Результаты отправки остаются в попытках отправки (MailingAttempt), поэтому очередь и её индексы не растут
+    неограниченно. Письма удаляются пачками по batch_size, чтобы не блокировать очередь одним долгим запросом.
+
+    Параметры:
+        days (int): Срок хранения обработанных писем в днях, по умолчанию MAILING_OUTBOX_RETENTION_DAYS.
+        batch_size (int): Количество писем, удаляемых одним запросом, по умолчанию MAILING_PURGE_BATCH_SIZE.
+
+    Возвращает:
+        int: Количество удалённых писем.
+    """
+
+    cutoff = timezone.now() - timedelta(days=days or settings.MAILING_OUTBOX_RETENTION_DAYS)
+    finished = OutboxMessage.objects.filter(status__in=['Отправлен', 'Отклонен'], run_time__lt=cutoff)
+    deleted = delete_in_batches(finished, batch_size)
+
+    if deleted:
+        logger.info('Из очереди удалено %s обработанных писем старше %s', deleted, cutoff)
+
+    return deleted
+
+
+class SessionBackoff:
+    """
+    Пауза отправки после отказов SMTP-сервера в сессии.
+
+    Если сервер отказал в сессии всем конвертам пачки (недоступен, отклонил учётные данные или адрес отправителя),
+    следующие пачки не забираются из очереди в течение паузы, растущей так же, как пауза повторной отправки писем
+    (см. get_retry_delay). Иначе каждая следующая пачка потратила бы попытку отправки всех своих писем впустую.
+    Пауза сбрасывается после первой пачки, которую сервер принял хотя бы частично.
+
+    Атрибуты:
+        failures (int): Количество пачек подряд, которым сервер отказал в сессии.
+        resume_at (float): Момент по time.monotonic(), до которого отправка приостановлена.
+    """
+
+    def __init__(self):
+        self.failures = 0
+        self.resume_at = 0.0
+
+    @property
+    def active(self):
+        return time.monotonic() < self.resume_at
+
+    def record(self, session_failed):
+        """
+        Учитывает результат отправки пачки.
+
+        Параметры:
+            session_failed (bool): Сервер отказал в сессии всем конвертам пачки (см. deliver_messages).
+        """
+
+        if not session_failed:
+            self.failures = 0
+
+            return
+
+        self.failures += 1
+        delay = get_retry_delay(self.failures)
+        self.resume_at = time.monotonic() + delay
+        logger.warning('SMTP-сервер отказал в сессии %s пачкам подряд, отправка приостановлена на %.0f с',
+                       self.failures, delay)
+
+
+session_backoff = SessionBackoff()
+
+
+def process_outbox(worker_id=None, engine=None, stop_event=None, budget=None):
+    """
+    Отправляет письма из очереди, пока в ней остаются доступные для аренды письма или пока не истечёт отведённое
+    время.
+
+    Если задан бюджет, новые пачки не забираются после того, как он истёк, а текущая пачка отправляется до конца.
+    Так планировщик между пачками крупной рассылки ставит в очередь рассылки, время которых наступило, и их письма
+    отправляются вперемешку с уже поставленными (см. materialize_due_mailings), а не после всей крупной рассылки.
+
+    Если SMTP-сервер отказывает в сессии, отправка приостанавливается (см. SessionBackoff), а пока пауза не истекла,
+    письма из очереди не забираются.
+
+    Параметры:
+        worker_id (str): Идентификатор обработчика, по умолчанию идентификатор текущего процесса.
+        engine (DeliveryEngine): Движок доставки, по умолчанию общий движок процесса.
+        stop_event (threading.Event): Событие остановки: после его установки новые пачки не забираются.
+        budget (float): Время в секундах, после которого новые пачки не забираются, None - без ограничения.
+
+    Возвращает:
+        int: Количество обработанных писем.
+    """
+
+    worker_id = worker_id or get_worker_id()
+    processed = 0
+    deadline = None if budget is None else time.monotonic() + budget
+
+    while not (stop_event and stop_event.is_set()):
+        if deadline is not None and time.monotonic() >= deadline:
+            logger.debug('Время запуска истекло, отправка продолжится в следующем запуске')
+            break
+
+        if session_backoff.active:
+            logger.debug('Отправка приостановлена после отказов SMTP-сервера в сессии')
+            break
+
+        with stage('claim'):
+            messages = claim_messages(worker_id)
+
+        if not messages:
+            break
+
+        session_backoff.record(deliver_messages(messages, engine, worker_id))
+        processed += len(messages)
+
+    registry.flush()
+
+    return processed
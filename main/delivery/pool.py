@@ -0,0 +1,406 @@
+import asyncio
+import logging
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from queue import LifoQueue, Empty
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+from .envelope import STAGE_CONNECT, STAGE_DATA, STAGE_MAIL, STAGE_RCPT, DeliveryResult
+
+logger = logging.getLogger(__name__)
+
+SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+
+def _decode(reply):
+    """
+    Приводит ответ SMTP-сервера к строке.
+
+    Параметры:
+        reply (bytes | str): Текст ответа сервера.
+
+    Возвращает:
+        str: Декодированный текст ответа.
+    """
+
+    if isinstance(reply, bytes):
+        return reply.decode('utf-8', 'replace')
+
+    return str(reply)
+
+
+class PooledConnection:
+    """
+    Открытое и авторизованное SMTP-соединение, принадлежащее пулу.
+
+    Атрибуты:
+        backend (EmailBackend): SMTP-бэкенд Django, выполнивший подключение, STARTTLS/SSL и авторизацию.
+        last_used (float): Момент последнего использования соединения (time.monotonic()).
+        sent (int): Количество конвертов, отправленных через соединение.
+    """
+
+    __slots__ = ('backend', 'last_used', 'sent')
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.last_used = time.monotonic()
+        self.sent = 0
+
+    @property
+    def smtp(self):
+        """
+        Возвращает объект smtplib.SMTP открытого соединения.
+        """
+
+        return self.backend.connection
+
+
+class SMTPConnectionPool:
+    """
+    Пул долгоживущих SMTP-соединений для массовой отправки писем.
+
+    Соединение открывается один раз (TCP, TLS, авторизация) и затем используется для отправки множества писем.
+    Размер пула ограничен: при исчерпании соединений вызывающий поток ждёт освобождения одного из них. Перед выдачей
+    простаивавшее соединение проверяется командой NOOP, соединение после обрыва открывается заново.
+
+    Атрибуты:
+        size (int): Максимальное количество одновременно открытых соединений.
+        health_check_interval (float): Время простоя в секундах, после которого соединение проверяется перед выдачей.
+        max_messages (int): Количество конвертов, после отправки которых соединение пересоздаётся (0 - без ограничения).
+        connection_kwargs (dict): Параметры подключения, передаваемые SMTP-бэкенду Django (host, port, username...).
+
+    Методы:
+        acquire(timeout=None): Выдаёт соединение из пула, при необходимости открывая новое.
+        release(conn, broken=False): Возвращает соединение в пул либо закрывает его.
+        connection(timeout=None): Контекстный менеджер для acquire/release.
+        send_batch(envelopes): Отправляет пачку конвертов через одно соединение пула.
+        close(): Закрывает все простаивающие соединения.
+    """
+
+    def __init__(self, size=None, health_check_interval=None, max_messages=None, **connection_kwargs):
+        self.size = size or settings.MAILING_SMTP_POOL_SIZE
+        self.health_check_interval = (settings.MAILING_SMTP_HEALTH_CHECK_INTERVAL
+                                      if health_check_interval is None else health_check_interval)
+        self.max_messages = settings.MAILING_SMTP_MAX_MESSAGES if max_messages is None else max_messages
+        self.connection_kwargs = connection_kwargs
+        self._idle = LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._closed = False
+
+    def _open(self):
+        backend = get_connection(SMTP_BACKEND, fail_silently=False, **self.connection_kwargs)
+        backend.open()
+
+        return PooledConnection(backend)
+
+    def _is_healthy(self, conn):
+        if conn.smtp is None:
+            return False
+
+        if self.max_messages and conn.sent >= self.max_messages:
+            return False
+
+        if time.monotonic() - conn.last_used < self.health_check_interval:
+            return True
+
+        try:
+            code, _ = conn.smtp.noop()
+        except (smtplib.SMTPException, OSError):
+            return False
+
+        return code == 250
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.backend.close()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+    def acquire(self, timeout=None):
+        """
+        Выдаёт исправное соединение из пула.
+
+        Параметры:
+            timeout (float): Максимальное время ожидания свободного соединения в секундах, None - без ограничения.
+
+        Возвращает:
+            PooledConnection: Открытое соединение.
+
+        Исключения:
+            TimeoutError: Свободное соединение не появилось за отведённое время.
+            smtplib.SMTPException, OSError: Не удалось открыть новое соединение.
+        """
+
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError('Нет свободных SMTP-соединений в пуле')
+
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except Empty:
+                    return self._open()
+
+                if self._is_healthy(conn):
+                    return conn
+
+                self._discard(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        """
+        Возвращает соединение в пул.
+
+        Параметры:
+            conn (PooledConnection): Соединение, полученное через acquire().
+            broken (bool): Соединение неисправно и должно быть закрыто.
+        """
+
+        try:
+            if broken or self._closed:
+                self._discard(conn)
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """
+        Контекстный менеджер, выдающий соединение и возвращающий его в пул по завершении блока.
+
+        Соединение закрывается, если внутри блока произошёл обрыв связи.
+        """
+
+        conn = self.acquire(timeout)
+        broken = False
+
+        try:
+            yield conn
+        except (smtplib.SMTPServerDisconnected, OSError):
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken)
+
+    def send_batch(self, envelopes):
+        """
+        Отправляет пачку конвертов через одно соединение пула.
+
+        При обрыве соединения оно открывается заново и отправка конверта повторяется один раз. Ошибки SMTP
+        не пробрасываются, а возвращаются в виде результатов по каждому получателю. Команды MAIL FROM, RCPT TO
+        и DATA отправляются по отдельности: получатель, отклонённый на RCPT TO, получает ответ на свою команду
+        (STAGE_RCPT), даже если затем сервер отклонил письмо остальным получателям на DATA (STAGE_DATA).
+
+        Параметры:
+            envelopes (Iterable[Envelope]): Конверты для отправки.
+
+        Возвращает:
+            list[DeliveryResult]: Результаты отправки по каждому получателю каждого конверта.
+        """
+
+        results = []
+        envelopes = iter(envelopes)
+
+        try:
+            conn = self.acquire()
+        except (smtplib.SMTPException, OSError) as e:
+            return self._fail_all(envelopes, e, STAGE_CONNECT)
+
+        try:
+            for envelope in envelopes:
+                for retry in (False, True):
+                    if conn is None:
+                        try:
+                            conn = self._open()
+                        except (smtplib.SMTPException, OSError) as e:
+                            logger.error('Не удалось открыть SMTP-соединение: %s', e)
+                            results.extend(self._failure(envelope, getattr(e, 'smtp_code', None), str(e),
+                                                         stage=STAGE_CONNECT))
+                            results.extend(self._fail_all(envelopes, e, STAGE_CONNECT))
+
+                            return results
+
+                    try:
+                        results.extend(self._transmit(conn, envelope))
+                        break
+                    except (smtplib.SMTPServerDisconnected, OSError) as e:
+                        self._discard(conn)
+                        conn = None
+
+                        if retry:
+                            logger.warning('SMTP-соединение потеряно повторно: %s', e)
+                            results.extend(self._failure(envelope, None, str(e), stage=STAGE_CONNECT))
+                    except smtplib.SMTPException as e:
+                        results.extend(self._failure(envelope, None, str(e), stage=STAGE_CONNECT))
+                        break
+        finally:
+            if conn is not None:
+                self.release(conn)
+            else:
+                self._slots.release()
+
+        return results
+
+    def _transmit(self, conn, envelope):
+        smtp = conn.smtp
+        started = time.monotonic()
+
+        try:
+            smtp.ehlo_or_helo_if_needed()
+            options = [f'size={len(envelope.data)}'] if smtp.does_esmtp and smtp.has_extn('size') else []
+            code, reply = smtp.mail(envelope.sender, options)
+
+            if code != 250:
+                self._reset(smtp, code)
+
+                return self._failure(envelope, code, _decode(reply), time.monotonic() - started, STAGE_MAIL)
+
+            replies = {}
+
+            for recipient in envelope.recipients:
+                code, reply = smtp.rcpt(recipient)
+                replies[recipient] = (code, reply, STAGE_RCPT)
+
+            accepted = [recipient for recipient, (code, _, _) in replies.items() if code in (250, 251)]
+
+            if accepted:
+                try:
+                    code, reply = smtp.data(envelope.data)
+                except smtplib.SMTPDataError as e:
+                    code, reply = e.smtp_code, e.smtp_error
+
+                for recipient in accepted:
+                    replies[recipient] = (code, reply, STAGE_DATA)
+
+            if not accepted or code != 250:
+                self._reset(smtp, code)
+        finally:
+            conn.sent += 1
+            conn.last_used = time.monotonic()
+
+        latency = time.monotonic() - started
+
+        return [DeliveryResult(envelope, recipient, code, _decode(reply), latency, stage)
+                for recipient, (code, reply, stage) in replies.items()]
+
+    @staticmethod
+    def _reset(smtp, code):
+        if code == 421:
+            smtp.close()
+
+            return
+
+        try:
+            smtp.rset()
+        except smtplib.SMTPServerDisconnected:
+            pass
+
+    @staticmethod
+    def _failure(envelope, code, message, latency=0.0, stage=STAGE_DATA):
+        return [DeliveryResult(envelope, recipient, code, message, latency, stage) for recipient in envelope.recipients]
+
+    def _fail_all(self, envelopes, error, stage):
+        results = []
+
+        for envelope in envelopes:
+            results.extend(self._failure(envelope, getattr(error, 'smtp_code', None), str(error), stage=stage))
+
+        return results
+
+    def close(self):
+        """
+        Закрывает пул: простаивающие соединения закрываются сразу, выданные - при возврате.
+        """
+
+        self._closed = True
+
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                break
+
+            self._discard(conn)
+
+
+class PooledTransport:
+    """
+    Транспорт движка доставки поверх пула блокирующих SMTP-соединений.
+
+    Каждая отправка выполняется в отдельном потоке исполнителя, поэтому цикл asyncio движка не блокируется
+    сетевым обменом.
+
+    Атрибуты:
+        pool (SMTPConnectionPool): Пул SMTP-соединений.
+        executor (ThreadPoolExecutor): Исполнитель, в потоках которого выполняется отправка.
+    """
+
+    def __init__(self, pool=None, workers=None):
+        self.pool = pool or get_connection_pool()
+        self.executor = ThreadPoolExecutor(max_workers=workers or self.pool.size, thread_name_prefix='smtp')
+
+    async def send(self, envelope):
+        """
+        Отправляет конверт через одно из соединений пула.
+
+        Параметры:
+            envelope (Envelope): Конверт для отправки.
+
+        Возвращает:
+            list[DeliveryResult]: Результаты отправки по каждому получателю конверта.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(self.executor, self.pool.send_batch, [envelope])
+
+    async def aclose(self):
+        """
+        Дожидается завершения отправок и останавливает потоки исполнителя.
+        """
+
+        self.executor.shutdown(wait=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool():
+    """
+    Возвращает общий для процесса пул SMTP-соединений, создавая его при первом обращении.
+
+    Возвращает:
+        SMTPConnectionPool: Пул соединений с параметрами подключения из настроек проекта.
+    """
+
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPConnectionPool()
+
+        return _pool
+
+
+def close_connection_pool():
+    """
+    Закрывает общий пул SMTP-соединений процесса.
+    """
+
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
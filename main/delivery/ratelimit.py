@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+
+logger = logging.getLogger(__name__)
+
+# Резервирует count жетонов корзины KEYS[1] и возвращает время ожидания до их появления в секундах.
+# Время берётся у Redis, поэтому часы разных процессов и машин не влияют на темп отправки.
+RESERVE_SCRIPT = """
+local rate, burst, count = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate) - count
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 1)
+if tokens >= 0 then
+    return '0'
+end
+return tostring(-tokens / rate)
+"""
+
+
+class TokenBucket:
+    """
+    Корзина жетонов в памяти процесса.
+
+    Жетоны пополняются со скоростью rate в секунду до объёма burst. Резервирование всегда списывает жетоны, в том
+    числе в долг, и возвращает время, через которое они будут доступны, поэтому порядок отправок сохраняется.
+
+    Атрибуты:
+        rate (float): Скорость пополнения, жетонов в секунду.
+        burst (float): Максимальное количество накопленных жетонов.
+        tokens (float): Текущее количество жетонов (отрицательное значение означает долг).
+        updated (float): Момент последнего пересчёта (time.monotonic()).
+    """
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self, count=1):
+        """
+        Резервирует жетоны.
+
+        Параметры:
+            count (int): Количество жетонов.
+
+        Возвращает:
+            float: Время в секундах, через которое жетоны будут доступны.
+        """
+
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate) - count
+        self.updated = now
+
+        return max(0.0, -self.tokens / self.rate)
+
+
+class RateLimiter:
+    """
+    Ограничение темпа отправки корзинами жетонов на SMTP-релей и на домен получателя.
+
+    Корзины хранятся в Redis (бэкенд кеша по умолчанию) и общие для всех процессов, отправляющих через тот же
+    релей. Если кеш не является Redis или Redis недоступен, используются корзины в памяти процесса.
+
+    Атрибуты:
+        relay (str): Имя релея, для которого действует общий лимит.
+        relay_rate (float): Писем в секунду через релей (0 - без ограничения).
+        relay_burst (float): Количество писем, которые можно отправить через релей без паузы.
+        domain_rate (float): Получателей в секунду для одного домена (0 - без ограничения).
+        domain_burst (float): Количество получателей домена, которым можно отправить без паузы.
+        domain_rates (dict): Индивидуальные лимиты доменов {домен: получателей в секунду}.
+
+    Методы:
+        reserve(key, rate, burst, count=1): Резервирует жетоны корзины и возвращает время ожидания.
+        wait(envelope): Асинхронно ждёт, пока конверт можно будет отправить.
+    """
+
+    def __init__(self, relay=None, relay_rate=None, relay_burst=None, domain_rate=None, domain_burst=None,
+                 domain_rates=None):
+        self.relay = relay or f'{settings.EMAIL_HOST}:{settings.EMAIL_PORT}'
+        self.relay_rate = settings.MAILING_RELAY_RATE if relay_rate is None else relay_rate
+        self.relay_burst = relay_burst or settings.MAILING_RELAY_BURST or max(self.relay_rate, 1)
+        self.domain_rate = settings.MAILING_DOMAIN_RATE if domain_rate is None else domain_rate
+        self.domain_burst = domain_burst or settings.MAILING_DOMAIN_BURST or max(self.domain_rate, 1)
+        self.domain_rates = settings.MAILING_DOMAIN_RATES if domain_rates is None else domain_rates
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._script = None
+
+    @property
+    def enabled(self):
+        """
+        Возвращает True, если задан хотя бы один лимит.
+        """
+
+        return bool(self.relay_rate or self.domain_rate or self.domain_rates)
+
+    def _get_script(self):
+        if self._script is None:
+            if not isinstance(cache, RedisCache):
+                logger.info('Кеш не использует Redis, лимиты отправки действуют в пределах процесса')
+                self._script = False
+
+                return False
+
+            self._script = cache._cache.get_client(write=True).register_script(RESERVE_SCRIPT)
+
+        return self._script
+
+    def reserve(self, key, rate, burst, count=1):
+        """
+        Резервирует жетоны корзины.
+
+        Параметры:
+            key (str): Имя корзины.
+            rate (float): Скорость пополнения корзины, жетонов в секунду.
+            burst (float): Объём корзины.
+            count (int): Количество жетонов.
+
+        Возвращает:
+            float: Время в секундах, через которое жетоны будут доступны.
+        """
+
+        if self._script is not False:
+            try:
+                if script := self._get_script():
+                    return float(script(keys=[cache.make_key(f'mailing-rate:{key}')], args=[rate, burst, count]))
+            except Exception as e:
+                logger.warning('Общие лимиты отправки недоступны, используются лимиты процесса: %s', e)
+                self._script = False
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+
+            if bucket is None or bucket.rate != rate:
+                bucket = self._buckets[key] = TokenBucket(rate, burst)
+
+            return bucket.reserve(count)
+
+    def _reserve_envelope(self, envelope):
+        delay = 0.0
+
+        if self.relay_rate:
+            delay = self.reserve(f'relay:{self.relay}', self.relay_rate, self.relay_burst)
+
+        domains = {}
+
+        for recipient in envelope.recipients:
+            domain = recipient.rpartition('@')[2].lower()
+            domains[domain] = domains.get(domain, 0) + 1
+
+        for domain, count in domains.items():
+            rate = self.domain_rates.get(domain, self.domain_rate)
+
+            if rate:
+                burst = max(self.domain_burst, rate) if domain in self.domain_rates else self.domain_burst
+                delay = max(delay, self.reserve(f'domain:{domain}', rate, burst, count))
+
+        return delay
+
+    async def wait(self, envelope):
+        """
+        Ждёт, пока конверт можно будет отправить, не превышая лимиты релея и доменов получателей.
+
+        Параметры:
+            envelope (Envelope): Конверт для отправки.
+        """
+
+        if not self.enabled:
+            return
+
+        delay = await asyncio.get_running_loop().run_in_executor(None, self._reserve_envelope, envelope)
+
+        if delay > 0:
+            await asyncio.sleep(delay)
@@ -0,0 +1,53 @@
+from django.conf import settings
+
+
+def iter_keyset(queryset, fields, key, chunk_size=None):
+    """
+    Построчно перебирает выборку кусками с постраничной выборкой по ключу (keyset pagination).
+
+    Каждый кусок загружается отдельным запросом WHERE key > последний_ключ ORDER BY key LIMIT chunk_size,
+    поэтому в памяти одновременно находится не больше одного куска, долгоживущий курсор на сервере не нужен,
+    а стоимость запроса не растёт по мере продвижения, как при OFFSET.
+
+    Параметры:
+        queryset (QuerySet): Исходная выборка.
+        fields (list[str]): Загружаемые поля; первым должно быть поле key.
+        key (str): Уникальное поле, по которому упорядочивается и продолжается выборка.
+        chunk_size (int): Размер куска, по умолчанию MAILING_RECIPIENTS_CHUNK_SIZE.
+
+    Возвращает:
+        Iterator[tuple]: Кортежи значений полей fields.
+    """
+
+    chunk_size = chunk_size or settings.MAILING_RECIPIENTS_CHUNK_SIZE
+    queryset = queryset.order_by(key).values_list(*fields)
+    chunk = list(queryset[:chunk_size])
+
+    while chunk:
+        yield from chunk
+
+        if len(chunk) < chunk_size:
+            return
+
+        chunk = list(queryset.filter(**{f'{key}__gt': chunk[-1][0]})[:chunk_size])
+
+
+def iter_mailing_client_ids(mailing, chunk_size=None):
+    """
+    Перебирает идентификаторы клиентов рассылки, не загружая модели клиентов.
+
+    Выборка идёт по промежуточной таблице связи рассылки с клиентами по её уникальному индексу
+    (mailing_id, client_id).
+
+    Параметры:
+        mailing (Mailing): Рассылка.
+        chunk_size (int): Размер куска, по умолчанию MAILING_RECIPIENTS_CHUNK_SIZE.
+
+    Возвращает:
+        Iterator[int]: Идентификаторы клиентов в порядке возрастания.
+    """
+
+    through = mailing.clients.through.objects.filter(mailing_id=mailing.pk)
+
+    for client_id, in iter_keyset(through, ['client_id'], 'client_id', chunk_size):
+        yield client_id
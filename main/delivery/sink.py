@@ -0,0 +1,181 @@
+import asyncio
+import random
+import threading
+
+
+class SMTPSink:
+    """
+    Локальный SMTP-сервер-заглушка для замеров и отладки отправки без реального почтового сервера.
+
+    Сервер работает в отдельном потоке с собственным циклом asyncio, принимает любые письма и только подсчитывает
+    их. Поддерживает EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP и QUIT, анонсирует расширение PIPELINING.
+    Для имитации реального сервера можно задать задержку ответа на письмо и долю получателей, отклоняемых временной
+    (451) или постоянной (550) ошибкой.
+
+    Атрибуты:
+        host (str): Адрес, на котором слушает сервер.
+        port (int): Порт сервера. При значении 0 порт выбирается автоматически и доступен после запуска.
+        keep_messages (bool): Сохранять ли принятые письма в списке messages.
+        latency (float): Задержка ответа на письмо (после DATA) в секундах.
+        transient_rate (float): Доля получателей, отклоняемых кодом 451.
+        permanent_rate (float): Доля получателей, отклоняемых кодом 550.
+        messages (list): Принятые письма в виде кортежей (отправитель, получатели, данные).
+        sessions (int): Количество принятых SMTP-сессий.
+        delivered (int): Количество принятых писем.
+        recipients (int): Количество принятых получателей.
+
+    Использование:
+        with SMTPSink() as sink:
+            send(host=sink.host, port=sink.port)
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, keep_messages=False, latency=0.0, transient_rate=0.0,
+                 permanent_rate=0.0):
+        self.host = host
+        self.port = port
+        self.keep_messages = keep_messages
+        self.latency = latency
+        self.transient_rate = transient_rate
+        self.permanent_rate = permanent_rate
+        self.messages = []
+        self.sessions = 0
+        self.delivered = 0
+        self.recipients = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._started = threading.Event()
+
+    def __enter__(self):
+        self.start()
+
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """
+        Запускает сервер в фоновом потоке и дожидается готовности к приёму соединений.
+        """
+
+        self._thread = threading.Thread(target=self._run, name='smtp-sink', daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def stop(self):
+        """
+        Останавливает сервер и его поток.
+        """
+
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port, limit=2 ** 26)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            tasks = asyncio.all_tasks(self._loop)
+
+            for task in tasks:
+                task.cancel()
+
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+    async def reply_to(self, command, session):
+        """
+        Формирует ответ на команду клиента. Может быть переопределён для имитации отказов сервера.
+
+        Параметры:
+            command (str): Команда в верхнем регистре (MAIL, RCPT, DATA, ...).
+            session (dict): Состояние SMTP-сессии, строка текущей команды доступна по ключу 'line'.
+
+        Возвращает:
+            bytes | None: Ответ сервера либо None для ответа по умолчанию.
+        """
+
+        return None
+
+    async def _handle(self, reader, writer):
+        self.sessions += 1
+        session = {'sender': None, 'recipients': []}
+        writer.write(b'220 localhost ESMTP sink\r\n')
+
+        try:
+            while True:
+                line = await reader.readline()
+
+                if not line:
+                    break
+
+                command = line[:4].upper().decode('ascii', 'replace')
+                session['line'] = line.decode('utf-8', 'replace').strip()
+                reply = await self.reply_to(command, session)
+
+                if reply is not None:
+                    writer.write(reply)
+                elif command == 'EHLO':
+                    writer.write(b'250-localhost\r\n250-PIPELINING\r\n250-8BITMIME\r\n250 SIZE 52428800\r\n')
+                elif command == 'HELO':
+                    writer.write(b'250 localhost\r\n')
+                elif command == 'MAIL':
+                    session['sender'] = line[10:].strip()
+                    session['recipients'] = []
+                    writer.write(b'250 OK\r\n')
+                elif command == 'RCPT':
+                    chance = random.random()
+
+                    if chance < self.permanent_rate:
+                        writer.write(b'550 Mailbox unavailable\r\n')
+                    elif chance < self.permanent_rate + self.transient_rate:
+                        writer.write(b'451 Try again later\r\n')
+                    else:
+                        session['recipients'].append(line[8:].strip())
+                        writer.write(b'250 OK\r\n')
+                elif command == 'DATA' and (session['sender'] is None or not session['recipients']):
+                    writer.write(b'503 No valid recipients\r\n')
+                elif command == 'DATA':
+                    writer.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+                    data = await reader.readuntil(b'\r\n.\r\n')
+
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+
+                    self.delivered += 1
+                    self.recipients += len(session['recipients'])
+
+                    if self.keep_messages:
+                        self.messages.append((session['sender'], session['recipients'], data[:-5]))
+
+                    session['sender'] = None
+                    writer.write(b'250 OK queued\r\n')
+                elif command == 'RSET':
+                    session['sender'] = None
+                    session['recipients'] = []
+                    writer.write(b'250 OK\r\n')
+                elif command == 'NOOP':
+                    writer.write(b'250 OK\r\n')
+                elif command == 'QUIT':
+                    writer.write(b'221 Bye\r\n')
+                    break
+                else:
+                    writer.write(b'502 Command not implemented\r\n')
+
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
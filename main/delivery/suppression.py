@@ -0,0 +1,190 @@
+import hashlib
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db import DatabaseError
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import SuppressedAddress
+from .recipients import iter_keyset
+
+logger = logging.getLogger(__name__)
+
+UNSUBSCRIBE_SALT = 'mailing-unsubscribe'
+
+
+def _key(email, owner=None):
+    value = f'{owner or ""}:{email.lower()}'.encode()
+
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'big')
+
+
+class SuppressionList:
+    """
+    Снимок списка подавления адресов (модель SuppressedAddress) в памяти процесса.
+
+    Адреса хранятся в множестве 64-битных хешей пар (владелец, адрес), поэтому проверка получателя выполняется
+    за постоянное время без запросов к базе данных, а миллион адресов занимает десятки мегабайт. Вероятность
+    совпадения хешей разных адресов пренебрежимо мала (порядка 10^-8 на миллион адресов), поэтому, в отличие
+    от фильтра Блума, снимок не подавляет лишних получателей.
+
+    Снимок обновляется не чаще чем раз в MAILING_SUPPRESSION_REFRESH_INTERVAL секунд: загружаются адреса, добавленные
+    после начала предыдущего обновления, с запасом MAILING_SUPPRESSION_REFRESH_MARGIN секунд. Запас нужен для
+    записей, транзакция которых зафиксирована позже, чем было записано время их добавления. Раз
+    в MAILING_SUPPRESSION_RELOAD_INTERVAL секунд снимок загружается заново целиком, чтобы учесть удалённые из списка
+    адреса.
+
+    Методы:
+        refresh(force=False): Обновляет снимок, если истёк интервал обновления.
+        add(email, owner=None): Добавляет адрес в снимок.
+        is_suppressed(email, owner=None): Проверяет, подавлен ли адрес глобально или для владельца.
+    """
+
+    def __init__(self):
+        self._keys = set()
+        self._loaded_since = None
+        self._refreshed_at = float('-inf')
+        self._reloaded_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """
+        Обновляет снимок, если истёк интервал обновления.
+
+        Если база данных недоступна, используется прежний снимок.
+
+        Параметры:
+            force (bool): Загрузить снимок заново целиком независимо от интервалов.
+        """
+
+        now = time.monotonic()
+
+        if not force and now - self._refreshed_at < settings.MAILING_SUPPRESSION_REFRESH_INTERVAL:
+            return
+
+        reload = force or now - self._reloaded_at >= settings.MAILING_SUPPRESSION_RELOAD_INTERVAL
+        started = timezone.now()
+        addresses = SuppressedAddress.objects.all()
+
+        if not reload:
+            margin = timedelta(seconds=settings.MAILING_SUPPRESSION_REFRESH_MARGIN)
+            addresses = addresses.filter(created_at__gte=self._loaded_since - margin)
+
+        keys = []
+
+        try:
+            for _, email, owner in iter_keyset(addresses, ['pk', 'email', 'owner_id'], 'pk'):
+                keys.append(_key(email, owner))
+        except DatabaseError as e:
+            logger.error('Не удалось обновить список подавления: %s', e)
+
+            return
+
+        with self._lock:
+            if reload:
+                self._keys = set(keys)
+                self._reloaded_at = now
+            else:
+                self._keys.update(keys)
+
+            self._loaded_since = started
+            self._refreshed_at = now
+
+    def add(self, email, owner=None):
+        """
+        Добавляет адрес в снимок, не дожидаясь его обновления из базы данных.
+
+        Параметры:
+            email (str): Адрес получателя.
+            owner (int): Идентификатор владельца рассылок, None для общего списка.
+        """
+
+        with self._lock:
+            self._keys.add(_key(email, owner))
+
+    def is_suppressed(self, email, owner=None):
+        """
+        Проверяет, подавлен ли адрес глобально или для владельца рассылки.
+
+        Параметры:
+            email (str): Адрес получателя.
+            owner (int): Идентификатор владельца рассылки.
+
+        Возвращает:
+            bool: Письма на адрес отправлять нельзя.
+        """
+
+        keys = self._keys
+
+        return _key(email) in keys or (owner is not None and _key(email, owner) in keys)
+
+
+suppression_list = SuppressionList()
+
+
+def suppress_addresses(addresses):
+    """
+    Добавляет адреса в список подавления и в снимок текущего процесса.
+
+    Адреса, уже находящиеся в списке, пропускаются.
+
+    Параметры:
+        addresses (list[SuppressedAddress]): Несохранённые записи списка подавления.
+    """
+
+    if not addresses:
+        return
+
+    for address in addresses:
+        address.email = address.email.lower()
+
+    SuppressedAddress.objects.bulk_create(addresses, ignore_conflicts=True)
+
+    for address in addresses:
+        suppression_list.add(address.email, address.owner_id)
+        logger.info('Адрес %s добавлен в список подавления%s: %s', address.email,
+                    f' владельца {address.owner_id}' if address.owner_id else '', address.get_reason_display())
+
+
+def get_unsubscribe_url(owner, email=None):
+    """
+    Формирует подписанную ссылку отписки получателя от рассылок владельца.
+
+    Ссылка без адреса получателя используется в письмах пакетной отправки, где получатели скрыты: страница отписки
+    запрашивает адрес и отправляет на него личную ссылку отписки.
+
+    Параметры:
+        owner (int): Идентификатор владельца рассылки.
+        email (str): Адрес получателя, None - ссылка отписки от рассылок владельца без адреса.
+
+    Возвращает:
+        str: Абсолютная ссылка на страницу отписки.
+    """
+
+    token = signing.dumps([owner, email and email.lower()], salt=UNSUBSCRIBE_SALT)
+
+    return f'{settings.SITE_URL}{reverse("main:unsubscribe", args=[token])}'
+
+
+def load_unsubscribe_token(token):
+    """
+    Проверяет подпись ссылки отписки.
+
+    Параметры:
+        token (str): Токен из ссылки, сформированной get_unsubscribe_url().
+
+    Возвращает:
+        tuple[int, str | None]: Идентификатор владельца рассылки и адрес получателя (None для ссылки без адреса).
+
+    Исключения:
+        signing.BadSignature: Токен повреждён или подделан.
+    """
+
+    owner, email = signing.loads(token, salt=UNSUBSCRIBE_SALT)
+
+    return owner, email
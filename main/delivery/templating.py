@@ -0,0 +1,162 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.template import Context, Engine, TemplateSyntaxError
+from django.template.base import FilterExpression, Node, TextNode, VariableNode
+from django.template.defaulttags import (CommentNode, FirstOfNode, ForNode, IfNode, SpacelessNode, TemplateTagNode,
+                                         VerbatimNode, WithNode)
+from django.template.smartif import TokenBase
+
+TEMPLATE_FIELDS = ('email', 'last_name', 'first_name', 'second_name')
+
+ALLOWED_NODES = (TextNode, VariableNode, IfNode, ForNode, WithNode, FirstOfNode, CommentNode, SpacelessNode,
+                 VerbatimNode, TemplateTagNode)
+
+engine = Engine(autoescape=False)
+
+
+class MessageTemplate:
+    """
+    Скомпилированные шаблоны темы и текста рассылки.
+
+    Шаблоны разбираются один раз при создании объекта, после чего отрисовываются для каждого получателя.
+    В шаблонах доступны поля клиента из TEMPLATE_FIELDS, например {{ first_name }}, фильтры и теги if, for, with,
+    firstof, comment, spaceless, verbatim и templatetag (ALLOWED_NODES). Остальные теги, например debug, недоступны:
+    шаблон с ними не компилируется.
+
+    Атрибуты:
+        subject (Template): Шаблон темы письма.
+        body (Template): Шаблон текста письма.
+        fields (tuple[str]): Поля клиента, которые используются в шаблонах.
+        personalized (bool): Текст или тема зависят от получателя.
+
+    Методы:
+        render(client): Возвращает тему и текст письма для клиента.
+    """
+
+    __slots__ = ('subject', 'body', 'fields', 'personalized')
+
+    def __init__(self, subject, body):
+        self.subject = _compile(subject)
+        self.body = _compile(body)
+        self.fields = get_referenced_fields(self.subject, self.body)
+        self.personalized = bool(self.fields)
+
+    def render(self, client):
+        """
+        Отрисовывает тему и текст письма для клиента.
+
+        Параметры:
+            client (Client): Клиент, у которого загружены поля fields.
+
+        Возвращает:
+            tuple[str, str]: Тема и текст письма.
+        """
+
+        context = Context({field: getattr(client, field) or '' for field in self.fields}, autoescape=False)
+
+        return self.subject.render(context), self.body.render(context)
+
+
+def _compile(source):
+    template = engine.from_string(source)
+
+    for node in template.nodelist.get_nodes_by_type(Node):
+        if type(node) not in ALLOWED_NODES:
+            tag = node.token.contents.split()[0] if node.token else type(node).__name__
+            raise TemplateSyntaxError(f'Тег {tag} недоступен в шаблонах рассылок')
+
+    return template
+
+
+def get_referenced_fields(*templates):
+    """
+    Определяет поля клиента, на которые ссылаются шаблоны.
+
+    Учитываются переменные в выводе ({{ first_name }}), в аргументах фильтров ({{ x|default:last_name }}) и в тегах,
+    в том числе вложенных ({% if last_name %}, {% with name=first_name %}). Константы ({{ "Привет" }}) пропускаются.
+
+    Параметры:
+        *templates (Template): Скомпилированные шаблоны.
+
+    Возвращает:
+        tuple[str]: Поля из TEMPLATE_FIELDS в порядке их объявления.
+    """
+
+    names = set()
+
+    for template in templates:
+        for node in template.nodelist.get_nodes_by_type(Node):
+            for expression in _iter_filter_expressions(list(vars(node).values())):
+                variables = [expression.var] + [arg for _, args in expression.filters for lookup, arg in args if lookup]
+
+                for variable in variables:
+                    lookups = getattr(variable, 'lookups', None)
+
+                    if lookups:
+                        names.add(lookups[0])
+
+    return tuple(field for field in TEMPLATE_FIELDS if field in names)
+
+
+def _iter_filter_expressions(value):
+    if isinstance(value, FilterExpression):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_filter_expressions(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_filter_expressions(item)
+    elif isinstance(value, TokenBase):
+        for item in (value.value, value.first, value.second):
+            yield from _iter_filter_expressions(item)
+
+
+_templates = OrderedDict()
+_templates_lock = threading.Lock()
+
+
+def get_message_template(mailing):
+    """
+    Возвращает скомпилированный шаблон рассылки из LRU-кеша процесса.
+
+    Шаблонами считаются только рассылки с флагом is_template, текст остальных рассылок отправляется как есть.
+    Ключ кеша состоит из идентификатора рассылки и хеша её темы и текста, поэтому после редактирования рассылки
+    шаблон компилируется заново, а устаревшая версия вытесняется из кеша. Размер кеша задаётся настройкой
+    MAILING_TEMPLATE_CACHE_SIZE.
+
+    Параметры:
+        mailing (Mailing): Рассылка с загруженными полями title, message и is_template.
+
+    Возвращает:
+        MessageTemplate | None: Шаблон рассылки либо None, если рассылка не является шаблоном или тема и текст
+                                не являются корректным шаблоном (такая рассылка отправляется как есть).
+    """
+
+    if not mailing.is_template:
+        return None
+
+    digest = hashlib.blake2b(f'{mailing.title}\0{mailing.message}'.encode(), digest_size=16).digest()
+    key = (mailing.pk, digest)
+
+    with _templates_lock:
+        if key in _templates:
+            _templates.move_to_end(key)
+
+            return _templates[key]
+
+    try:
+        template = MessageTemplate(mailing.title, mailing.message)
+    except TemplateSyntaxError:
+        template = None
+
+    with _templates_lock:
+        _templates[key] = template
+
+        while len(_templates) > settings.MAILING_TEMPLATE_CACHE_SIZE:
+            _templates.popitem(last=False)
+
+    return template
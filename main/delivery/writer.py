@@ -0,0 +1,137 @@
+import logging
+import time
+
+from django.conf import settings
+
+from ..metrics import registry
+from ..profiling import stage
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedWriter:
+    """
+    Буфер для пакетной записи объектов модели в базу данных через bulk_create.
+
+    Объекты накапливаются в памяти и записываются одним запросом, когда буфер заполнен или с момента последней
+    записи прошло больше flush_interval секунд. При использовании в качестве контекстного менеджера остаток
+    буфера записывается при выходе из блока, в том числе при исключении.
+
+    Атрибуты:
+        model (Model): Модель записываемых объектов.
+        batch_size (int): Количество объектов, при накоплении которого буфер записывается.
+        flush_interval (float): Максимальное время в секундах между записями буфера.
+        ignore_conflicts (bool): Пропускать объекты, нарушающие ограничения уникальности.
+        written (int): Количество записанных объектов.
+
+    Использование:
+        with BufferedWriter(MailingAttempt) as writer:
+            writer.add(MailingAttempt(...))
+    """
+
+    def __init__(self, model, batch_size=None, flush_interval=None, ignore_conflicts=False):
+        self.model = model
+        self.ignore_conflicts = ignore_conflicts
+        self.batch_size = batch_size or settings.MAILING_WRITE_BATCH_SIZE
+        self.flush_interval = settings.MAILING_WRITE_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.written = 0
+        self._buffer = []
+        self._flushed_at = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def add(self, obj):
+        """
+        Добавляет объект в буфер и записывает буфер, если он заполнен или устарел.
+
+        Параметры:
+            obj (Model): Несохранённый объект модели.
+        """
+
+        self._buffer.append(obj)
+
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Записывает все накопленные объекты одним запросом.
+        """
+
+        self._flushed_at = time.monotonic()
+
+        if not self._buffer:
+            return
+
+        batch, self._buffer = self._buffer, []
+        started = time.monotonic()
+
+        with stage(f'write:{self.model.__name__}'):
+            self._write(batch)
+
+        registry.observe('mailing_db_write_seconds', time.monotonic() - started, model=self.model.__name__)
+        self.written += len(batch)
+        logger.debug('Записано объектов %s: %s', self.model.__name__, len(batch))
+
+    def _write(self, batch):
+        self.model.objects.bulk_create(batch, batch_size=self.batch_size, ignore_conflicts=self.ignore_conflicts)
+
+
+class BufferedUpdater(BufferedWriter):
+    """
+    Буфер для пакетного обновления изменённых объектов модели через bulk_update.
+
+    Используется для сохранения промежуточного состояния длительной обработки: изменения записываются в базу данных
+    не реже чем раз в flush_interval секунд, поэтому после аварийного завершения процесса теряются только изменения
+    последнего интервала.
+
+    Атрибуты:
+        model (Model): Модель обновляемых объектов.
+        fields (list[str]): Обновляемые поля.
+        batch_size (int): Количество объектов, при накоплении которого буфер записывается.
+        flush_interval (float): Максимальное время в секундах между записями буфера.
+        queryset (QuerySet): Записи, среди которых выполняется обновление, по умолчанию все записи модели.
+                             Объекты вне этого набора не обновляются.
+        written (int): Количество обновлённых объектов.
+
+    Использование:
+        with BufferedUpdater(OutboxMessage, ['status']) as updater:
+            message.status = 'Отправлен'
+            updater.add(message)
+    """
+
+    def __init__(self, model, fields, batch_size=None, flush_interval=None, queryset=None):
+        super().__init__(model, batch_size=batch_size, flush_interval=flush_interval)
+        self.fields = fields
+        self.queryset = model.objects.all() if queryset is None else queryset
+
+    def _write(self, batch):
+        self.queryset.bulk_update(batch, self.fields, batch_size=self.batch_size)
+
+
+def delete_in_batches(queryset, batch_size=None):
+    """
+    Удаляет записи набора пачками, чтобы не блокировать таблицу одним долгим запросом.
+
+    Параметры:
+        queryset (QuerySet): Удаляемые записи.
+        batch_size (int): Количество записей, удаляемых одним запросом, по умолчанию MAILING_PURGE_BATCH_SIZE.
+
+    Возвращает:
+        int: Количество удалённых записей.
+    """
+
+    batch_size = batch_size or settings.MAILING_PURGE_BATCH_SIZE
+    deleted = 0
+
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+
+        if not ids:
+            return deleted
+
+        deleted += queryset.model.objects.filter(pk__in=ids).delete()[0]
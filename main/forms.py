@@ -1,5 +1,8 @@
 from django import forms
 from django.contrib.admin.widgets import AdminDateWidget, AdminTimeWidget
+from django.template import TemplateSyntaxError
+
+from .delivery.templating import TEMPLATE_FIELDS, MessageTemplate
 
 from .models import Mailing, Client
 
@@ -11,6 +14,12 @@ class MailingForm(forms.ModelForm):
     Атрибуты:
         scheduled_time (forms.DateTimeField): Поле для указания даты и времени отправки, отображается как ввод типа
                                               datetime-local.
+
+    Методы:
+        clean(): Проверяет, что заголовок и содержание рассылки с флагом is_template являются корректными шаблонами.
+
+    Шаблон проверяется так же, как при отправке: он компилируется (см. MessageTemplate) и отрисовывается для клиента
+    с пустыми полями. Заголовок и содержание рассылки без флага отправляются как есть и не проверяются.
     """
 
     scheduled_time = forms.DateTimeField(label='Дата и время отправки',
@@ -24,8 +33,35 @@ class MailingForm(forms.ModelForm):
             'status',
             'scheduled_time',
             'periodicity',
-            'clients'
+            'clients',
+            'batch_delivery',
+            'is_template',
         ]
+        help_texts = {
+            'is_template': 'В заголовке и содержании можно использовать поля клиента: '
+                           + ', '.join(f'{{{{ {field} }}}}' for field in TEMPLATE_FIELDS)
+                           + ', а также теги if, for и with.',
+            'batch_delivery': 'Одно письмо отправляется сразу группе получателей в скрытой копии. '
+                              'Только для рассылок без полей клиента.',
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+
+        if cleaned_data.get('is_template'):
+            for field in ('title', 'message'):
+                if field in cleaned_data:
+                    self._clean_template(field, cleaned_data[field])
+
+        return cleaned_data
+
+    def _clean_template(self, field, value):
+        try:
+            MessageTemplate(value, '').render(Client())
+        except TemplateSyntaxError as e:
+            self.add_error(field, f'Ошибка в шаблоне: {e}')
+        except Exception as e:
+            self.add_error(field, f'Шаблон не удаётся отрисовать: {e}')
 
 
 class ClientForm(forms.ModelForm):
@@ -43,3 +79,14 @@ class ClientForm(forms.ModelForm):
     class Meta:
         model = Client
         fields = ['email', 'last_name', 'first_name', 'second_name', 'comment']
+
+
+class UnsubscribeForm(forms.Form):
+    """
+    Форма запроса личной ссылки отписки по ссылке из письма пакетной отправки, в которой нет адреса получателя.
+
+    Атрибуты:
+        email (forms.EmailField): Адрес, который получатель хочет отписать от рассылок.
+    """
+
+    email = forms.EmailField(label='Почта')
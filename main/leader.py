@@ -0,0 +1,104 @@
+import logging
+import zlib
+
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """
+    Выбор единственного ведущего экземпляра планировщика в кластере через advisory-блокировку PostgreSQL.
+
+    Блокировка берётся функцией pg_try_advisory_lock на отдельном соединении с базой данных и удерживается, пока
+    открыто это соединение. Если процесс ведущего завершается или теряет связь с базой, PostgreSQL снимает
+    блокировку вместе с сессией, и её забирает первый из остальных экземпляров, проверивших лидерство.
+
+    Для баз данных без advisory-блокировок (например, SQLite при разработке) экземпляр всегда считается ведущим.
+
+    Атрибуты:
+        name (str): Имя блокировки, из которого вычисляется её числовой ключ.
+        key (int): Числовой ключ advisory-блокировки.
+        using (str): Псевдоним базы данных из настройки DATABASES.
+        is_leader (bool): Является ли экземпляр ведущим по результатам последней проверки.
+
+    Методы:
+        acquire(): Пытается стать ведущим либо подтверждает, что лидерство не потеряно.
+        release(): Отказывается от лидерства и закрывает соединение.
+    """
+
+    def __init__(self, name='mailing-scheduler', using='default'):
+        self.name = name
+        self.key = zlib.crc32(name.encode())
+        self.using = using
+        self.is_leader = False
+        self._connection = None
+
+    def _get_connection(self):
+        if self._connection is None:
+            self._connection = connections.create_connection(self.using)
+            self._connection.inc_thread_sharing()
+
+        return self._connection
+
+    def _drop_connection(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except DatabaseError:
+                pass
+
+            self._connection.dec_thread_sharing()
+            self._connection = None
+
+    def acquire(self):
+        """
+        Пытается стать ведущим либо подтверждает, что лидерство не потеряно.
+
+        Возвращает:
+            bool: Экземпляр является ведущим.
+        """
+
+        connection = self._get_connection()
+
+        if connection.vendor != 'postgresql':
+            if not self.is_leader:
+                logger.warning('База данных %s не поддерживает advisory-блокировки, планировщик считается ведущим',
+                               connection.vendor)
+                self.is_leader = True
+
+            return True
+
+        was_leader = self.is_leader
+
+        try:
+            with connection.cursor() as cursor:
+                if was_leader:
+                    cursor.execute('SELECT 1')
+                else:
+                    cursor.execute('SELECT pg_try_advisory_lock(%s)', [self.key])
+                    self.is_leader = cursor.fetchone()[0]
+        except DatabaseError as e:
+            logger.error('Соединение с блокировкой %s потеряно: %s', self.name, e)
+            self.is_leader = False
+            self._drop_connection()
+
+        if self.is_leader != was_leader:
+            logger.info('Планировщик %s ведущим (%s)', 'стал' if self.is_leader else 'перестал быть', self.name)
+
+        return self.is_leader
+
+    def release(self):
+        """
+        Отказывается от лидерства и закрывает соединение с блокировкой.
+        """
+
+        if self.is_leader and self._connection is not None and self._connection.vendor == 'postgresql':
+            try:
+                with self._connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_unlock(%s)', [self.key])
+            except DatabaseError:
+                pass
+
+        self.is_leader = False
+        self._drop_connection()
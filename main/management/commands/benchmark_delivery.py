@@ -0,0 +1,152 @@
+import json
+import resource
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ...delivery.aiosmtp import AsyncSMTPTransport
+from ...delivery.engine import DeliveryEngine
+from ...delivery.outbox import materialize_due_mailings, process_outbox
+from ...delivery.pool import PooledTransport, SMTPConnectionPool
+from ...delivery.ratelimit import RateLimiter
+from ...delivery.sink import SMTPSink
+from ...models import Client, Mailing
+from users.models import User
+
+
+class RecordingEngine(DeliveryEngine):
+    """
+    Движок доставки, запоминающий результаты отправки для отчёта.
+
+    Атрибуты:
+        results (list[DeliveryResult]): Результаты всех отправок движка.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.results = []
+
+    def deliver(self, envelopes):
+        for result in super().deliver(envelopes):
+            self.results.append(result)
+            yield result
+
+
+class Command(BaseCommand):
+    """
+    Команда для замера пропускной способности отправки рассылок через локальный SMTP-сервер-заглушку.
+
+    Команда:
+        - Запускает локальный SMTP-сервер-заглушку с заданной задержкой и долями временных и постоянных отказов.
+        - Создаёт во временной транзакции пользователя, заданное количество клиентов и рассылок (каждая рассылка
+          отправляется всем клиентам); по завершении транзакция откатывается.
+        - Ставит рассылки в очередь и отправляет очередь движком доставки так же, как send_mailing.
+        - Выводит количество писем в секунду, 50-й и 99-й процентили задержки отправки письма, количество запросов
+          к базе данных на письмо и пиковый объём памяти процесса (RSS).
+
+    В замер попадают и другие рассылки базы данных, время отправки которых наступило, поэтому команду следует
+    запускать на базе данных разработки или стенда.
+    """
+
+    help = 'Замеряет скорость отправки рассылок через локальный SMTP-сервер-заглушку'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000, help='Количество клиентов')
+        parser.add_argument('--mailings', type=int, default=5, help='Количество рассылок')
+        parser.add_argument('--latency', type=float, default=0.0, help='Задержка ответа сервера на письмо, с')
+        parser.add_argument('--transient-rate', type=float, default=0.0, help='Доля получателей с ответом 451')
+        parser.add_argument('--permanent-rate', type=float, default=0.0, help='Доля получателей с ответом 550')
+        parser.add_argument('--transport', choices=['pool', 'asyncio'], default=settings.MAILING_TRANSPORT,
+                            help='Транспорт движка доставки')
+        parser.add_argument('--concurrency', type=int, default=settings.MAILING_CONCURRENCY,
+                            help='Максимальное количество одновременных отправок')
+        parser.add_argument('--json', action='store_true', help='Вывести результаты одной строкой JSON')
+
+    def handle(self, *args, **options):
+        with SMTPSink(latency=options['latency'], transient_rate=options['transient_rate'],
+                      permanent_rate=options['permanent_rate']) as sink:
+            engine = RecordingEngine(transport=self._get_transport(sink, options), concurrency=options['concurrency'],
+                                     per_group_concurrency=options['concurrency'],
+                                     limiter=RateLimiter(relay_rate=0, domain_rate=0, domain_rates={}))
+            queries = []
+
+            def count_queries(execute, sql, params, many, context):
+                queries.append(sql)
+
+                return execute(sql, params, many, context)
+
+            try:
+                with transaction.atomic():
+                    self._seed(options['clients'], options['mailings'])
+
+                    with connection.execute_wrapper(count_queries):
+                        started = time.perf_counter()
+                        materialize_due_mailings(timezone.now())
+                        processed = process_outbox(worker_id='benchmark', engine=engine)
+                        elapsed = time.perf_counter() - started
+
+                    transaction.set_rollback(True)
+            finally:
+                engine.close()
+
+        latencies = sorted(result.latency for result in engine.results)
+        report = {
+            'messages': processed,
+            'seconds': round(elapsed, 3),
+            'messages_per_second': round(processed / elapsed, 1) if elapsed else 0,
+            'latency_p50_ms': round(self._percentile(latencies, 0.50) * 1000, 2),
+            'latency_p99_ms': round(self._percentile(latencies, 0.99) * 1000, 2),
+            'queries_per_message': round(len(queries) / processed, 3) if processed else 0,
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'accepted': sum(result.ok for result in engine.results),
+            'deferred': sum(result.transient for result in engine.results),
+            'rejected': sum(result.permanent for result in engine.results),
+            'smtp_sessions': sink.sessions,
+            'smtp_transactions': sink.delivered,
+            'window': engine.window_size,
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+        else:
+            for key, value in report.items():
+                self.stdout.write(f'{key}: {value}')
+
+    @staticmethod
+    def _get_transport(sink, options):
+        connection_kwargs = {'host': sink.host, 'port': sink.port, 'username': '', 'password': '', 'use_tls': False,
+                             'use_ssl': False}
+
+        if options['transport'] == 'asyncio':
+            return AsyncSMTPTransport(size=options['concurrency'], **connection_kwargs)
+
+        return PooledTransport(pool=SMTPConnectionPool(size=options['concurrency'], **connection_kwargs),
+                               workers=options['concurrency'])
+
+    @staticmethod
+    def _seed(clients_count, mailings_count):
+        owner = User.objects.bulk_create([User(email=f'benchmark-{time.time_ns()}@localhost')])[0]
+        clients = Client.objects.bulk_create(
+            [Client(email=f'client{i}-{owner.pk}@example{i % 10}.com', last_name='Иванов', first_name='Иван',
+                    owner=owner) for i in range(clients_count)],
+            batch_size=5000,
+        )
+        mailings = Mailing.objects.bulk_create(
+            [Mailing(title=f'Тестовая рассылка {i}', message='Текст тестовой рассылки', owner=owner,
+                     scheduled_time=timezone.now()) for i in range(mailings_count)]
+        )
+        Mailing.clients.through.objects.bulk_create(
+            [Mailing.clients.through(mailing_id=mailing.pk, client_id=client.pk)
+             for mailing in mailings for client in clients],
+            batch_size=5000,
+        )
+
+    @staticmethod
+    def _percentile(values, fraction):
+        if not values:
+            return 0.0
+
+        return values[min(len(values) - 1, int(len(values) * fraction))]
@@ -0,0 +1,70 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from ...delivery.recipients import iter_mailing_client_ids
+from ...models import Client, Mailing
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Команда для замера расхода памяти при переборе получателей большой рассылки.
+
+    Команда:
+        - Создаёт во временной транзакции пользователя, рассылку и заданное количество клиентов с длинными
+          комментариями; по завершении транзакция откатывается.
+        - Перебирает получателей рассылки целыми моделями клиентов (mailing.clients.all()).
+        - Перебирает получателей кусками по ключу, загружая только идентификаторы.
+        - Выводит время и пиковый объём памяти Python (tracemalloc) для обоих способов.
+    """
+
+    help = 'Сравнивает расход памяти при переборе получателей рассылки целиком и кусками по ключу'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=100000, help='Количество клиентов рассылки')
+        parser.add_argument('--comment-size', type=int, default=1000, help='Длина комментария клиента')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            mailing = self._seed(options['clients'], options['comment_size'])
+
+            full = self._measure(lambda: [client.email for client in mailing.clients.all()])
+            streamed = self._measure(lambda: sum(1 for _ in iter_mailing_client_ids(mailing)))
+
+            transaction.set_rollback(True)
+
+        for name, (elapsed, peak) in (('Модели целиком', full), ('Кусками по ключу', streamed)):
+            self.stdout.write(f'{name}: {elapsed:.2f} с, пик памяти {peak / 2 ** 20:.1f} МБ')
+
+    @staticmethod
+    def _seed(count, comment_size):
+        owner = User.objects.bulk_create([User(email=f'benchmark-{time.time_ns()}@localhost')])[0]
+        mailing = Mailing.objects.create(title='Тестовая рассылка', message='Текст', scheduled_time=timezone.now(),
+                                         owner=owner)
+        comment = 'x' * comment_size
+        clients = Client.objects.bulk_create(
+            [Client(email=f'client{i}-{owner.pk}@example.com', last_name='Иванов', first_name='Иван',
+                    comment=comment, owner=owner) for i in range(count)],
+            batch_size=5000,
+        )
+        Mailing.clients.through.objects.bulk_create(
+            [Mailing.clients.through(mailing_id=mailing.pk, client_id=client.pk) for client in clients],
+            batch_size=5000,
+        )
+
+        return mailing
+
+    @staticmethod
+    def _measure(func):
+        tracemalloc.start()
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return elapsed, peak
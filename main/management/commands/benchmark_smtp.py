@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+
+from ...delivery.aiosmtp import AsyncSMTPTransport
+from ...delivery.envelope import Envelope
+from ...delivery.pool import SMTPConnectionPool, SMTP_BACKEND
+from ...delivery.sink import SMTPSink
+
+
+class Command(BaseCommand):
+    """
+    Команда для сравнения стоимости отправки письма через отдельное соединение и через пул SMTP-соединений.
+
+    Команда:
+        - Запускает локальный SMTP-сервер-заглушку.
+        - Отправляет заданное количество писем, открывая новое соединение на каждое письмо (как send_mail).
+        - Отправляет то же количество писем через пул долгоживущих соединений.
+        - Отправляет то же количество писем через асинхронный транспорт с конвейерной отправкой команд.
+        - Выводит общее время и среднее время отправки одного письма для каждого способа.
+    """
+
+    help = 'Сравнивает отправку писем по одному соединению на письмо и через пул SMTP-соединений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000, help='Количество писем')
+        parser.add_argument('--pool-size', type=int, default=1, help='Размер пула соединений')
+        parser.add_argument('--async-connections', type=int, default=16,
+                            help='Количество соединений асинхронного транспорта')
+
+    def handle(self, *args, **options):
+        count = options['messages']
+
+        with SMTPSink() as sink:
+            connection_kwargs = {'host': sink.host, 'port': sink.port, 'username': '', 'password': '',
+                                 'use_tls': False, 'use_ssl': False}
+            messages = [
+                EmailMessage(subject='Тестовая рассылка', body='Текст тестовой рассылки', from_email='bench@localhost',
+                             to=[f'client{i}@example.com'])
+                for i in range(count)
+            ]
+
+            started = time.perf_counter()
+
+            for message in messages:
+                get_connection(SMTP_BACKEND, fail_silently=False, **connection_kwargs).send_messages([message])
+
+            single = time.perf_counter() - started
+
+            pool = SMTPConnectionPool(size=options['pool_size'], **connection_kwargs)
+            started = time.perf_counter()
+            envelopes = [Envelope(message.from_email, message.to, message.message().as_bytes(linesep='\r\n'))
+                         for message in messages]
+            results = pool.send_batch(envelopes)
+            pooled = time.perf_counter() - started
+            pool.close()
+
+            transport = AsyncSMTPTransport(size=options['async_connections'], **connection_kwargs)
+            started = time.perf_counter()
+            results += asyncio.run(self._send_async(transport, envelopes))
+            pipelined = time.perf_counter() - started
+
+        failed = sum(1 for result in results if not result.ok)
+
+        self.stdout.write(f'Соединение на письмо:    {single:.3f} с, {single / count * 1000:.3f} мс/письмо')
+        self.stdout.write(f'Пул соединений:          {pooled:.3f} с, {pooled / count * 1000:.3f} мс/письмо')
+        self.stdout.write(f'Асинхронный транспорт:   {pipelined:.3f} с, {pipelined / count * 1000:.3f} мс/письмо')
+        self.stdout.write(self.style.SUCCESS(f'Ускорение пула: {single / pooled:.1f}x, '
+                                             f'асинхронного транспорта: {single / pipelined:.1f}x, ошибок: {failed}'))
+
+    @staticmethod
+    async def _send_async(transport, envelopes):
+        try:
+            batches = await asyncio.gather(*(transport.send(envelope) for envelope in envelopes))
+        finally:
+            await transport.aclose()
+
+        return [result for batch in batches for result in batch]
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.template import Context
+
+from ...delivery.templating import engine, get_message_template
+from ...models import Client, Mailing
+
+
+class Command(BaseCommand):
+    """
+    Команда для замера скорости отрисовки персонализированных писем рассылки.
+
+    Команда:
+        - Создаёт в памяти (без записи в базу данных) рассылку с шаблоном и заданное количество клиентов.
+        - Отрисовывает письмо каждому клиенту, разбирая шаблон для каждого получателя.
+        - Отрисовывает письмо каждому клиенту скомпилированным шаблоном из кеша (get_message_template).
+        - Выводит количество отрисовок в секунду для обоих способов.
+    """
+
+    help = 'Сравнивает скорость отрисовки писем с разбором шаблона на каждого получателя и с кешем шаблонов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=100000, help='Количество клиентов')
+
+    def handle(self, *args, **options):
+        mailing = Mailing(pk=1, is_template=True, title='{{ first_name }}, новое предложение',
+                          message='Здравствуйте, {{ first_name }} {{ second_name }}!\n\n' + 'Текст рассылки. ' * 50)
+        clients = [Client(pk=i, email=f'client{i}@example.com', last_name='Иванов', first_name=f'Иван{i}',
+                          second_name='Иванович') for i in range(options['clients'])]
+
+        def parse_each():
+            for client in clients:
+                context = Context({'first_name': client.first_name, 'second_name': client.second_name},
+                                  autoescape=False)
+                engine.from_string(mailing.title).render(context)
+                engine.from_string(mailing.message).render(context)
+
+        def compiled():
+            for client in clients:
+                get_message_template(mailing).render(client)
+
+        for name, func in (('Разбор на каждого получателя', parse_each), ('Скомпилированный шаблон', compiled)):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{name}: {elapsed:.2f} с, {len(clients) / elapsed:.0f} писем/с')
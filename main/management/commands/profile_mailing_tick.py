@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...profiling import request_profile
+
+
+class Command(BaseCommand):
+    """
+    Команда для записи профиля cProfile одного запуска отправки рассылок.
+
+    Команда:
+        - Запрашивает через кеш запись профиля; запрос выполнит первый процесс, начавший запуск отправки
+          (планировщик или обработчик очереди).
+        - Профиль (.prof) и его текстовая сводка (.txt) сохраняются в каталог MAILING_PROFILE_DIR на сервере
+          этого процесса.
+    """
+
+    help = 'Записывает профиль cProfile следующего запуска отправки рассылок'
+
+    def handle(self, *args, **options):
+        request_profile()
+        self.stdout.write(self.style.SUCCESS(
+            f'Профиль следующего запуска будет сохранён в каталог {settings.MAILING_PROFILE_DIR}'
+        ))
@@ -0,0 +1,55 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ...delivery import mailqueue
+from ...delivery.engine import close_delivery_engine
+from ...delivery.outbox import get_worker_id, process_outbox
+from ...delivery.pool import close_connection_pool
+from ...profiling import profile_tick
+
+
+class Command(BaseCommand):
+    """
+    Команда для запуска дополнительного обработчика очереди писем рассылок.
+
+    Команда:
+        - Забирает письма рассылок из очереди пачками с блокировкой SKIP LOCKED и отправляет их.
+        - Отдельным потоком отправляет служебные письма, не дожидаясь окончания отправки пачки рассылки.
+        - При пустой очереди ждёт заданное время и проверяет её снова.
+        - Может быть запущена в любом количестве процессов и на нескольких серверах одновременно.
+        - По сигналу SIGTERM или SIGINT дожидается отправки текущей пачки и завершается.
+    """
+
+    help = 'Запускает обработчик очереди писем рассылок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--idle-sleep', type=float, default=1.0,
+                            help='Пауза в секундах при пустой очереди')
+
+    def handle(self, *args, **options):
+        worker_id = get_worker_id()
+        stopping = threading.Event()
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stopping.set())
+
+        transactional_lane = mailqueue.start_transactional_lane(stopping)
+        self.stdout.write(f'Обработчик очереди {worker_id} запущен')
+
+        while not stopping.is_set():
+            close_old_connections()
+
+            with profile_tick('outbox_worker'):
+                processed = process_outbox(worker_id, stop_event=stopping)
+
+            if not processed:
+                stopping.wait(options['idle_sleep'])
+
+        mailqueue.wakeup.set()
+        transactional_lane.join()
+        close_delivery_engine()
+        close_connection_pool()
+        self.stdout.write(self.style.SUCCESS('Обработчик очереди остановлен'))
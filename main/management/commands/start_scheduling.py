@@ -1,9 +1,40 @@
+import signal
+import threading
+
 from django.core.management.base import BaseCommand
-from ...tasks import start
+
+from ...notifications import ScheduleListener
+from ...tasks import start, stop, wake_up
 
 
 class Command(BaseCommand):
+    """
+    Команда для запуска планировщика рассылок в отдельном долгоживущем процессе.
+
+    Команда:
+        - Запускает планировщик, отправляющий рассылки ко времени ближайшей из них.
+        - Ждёт уведомлений об изменении рассылок (LISTEN/NOTIFY в PostgreSQL) и досрочно будит планировщик.
+        - Работает до получения сигнала SIGTERM или SIGINT.
+        - При остановке дожидается завершения текущей отправки и закрывает соединения.
+    """
+
     help = 'Start the mailing scheduler'
 
     def handle(self, *args, **kwargs):
-        start()
+        stopping = threading.Event()
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stopping.set())
+
+        scheduler = start()
+        listener = ScheduleListener()
+        self.stdout.write('Планировщик рассылок запущен')
+
+        while not stopping.is_set():
+            if listener.wait(timeout=1):
+                wake_up()
+
+        self.stdout.write('Остановка планировщика, завершение текущей отправки...')
+        listener.close()
+        stop(scheduler)
+        self.stdout.write(self.style.SUCCESS('Планировщик рассылок остановлен'))
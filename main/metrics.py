@@ -0,0 +1,233 @@
+import logging
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRICS = {
+    'mailing_messages_total': ('counter', 'Результаты отправки писем по статусу и коду ответа SMTP'),
+    'mailing_transactional_total': ('counter', 'Результаты отправки служебных писем по статусу'),
+    'mailing_transactional_delay_seconds': ('histogram', 'Время от постановки служебного письма в очередь до доставки'),
+    'mailing_smtp_latency_seconds': ('histogram', 'Время отправки письма SMTP-серверу'),
+    'mailing_db_write_seconds': ('histogram', 'Время пакетной записи в базу данных'),
+    'mailing_scheduler_tick_seconds': ('histogram', 'Длительность запуска планировщика рассылок'),
+    'mailing_stage_seconds': ('histogram', 'Время этапов запуска отправки (при MAILING_STAGE_TIMING)'),
+    'mailing_concurrency_window': ('gauge', 'Текущий размер окна одновременных отправок обработчика'),
+    'mailing_outbox_backlog': ('gauge', 'Письма очереди, время отправки которых наступило'),
+    'mailing_due_mailings': ('gauge', 'Активные рассылки, время отправки которых наступило'),
+}
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+
+    return name + '{' + ','.join(f'{key}="{value}"' for key, value in sorted(labels.items())) + '}'
+
+
+class MetricsRegistry:
+    """
+    Счётчики, гистограммы и показатели отправки рассылок в формате Prometheus.
+
+    Значения накапливаются в памяти процесса и не реже чем раз в MAILING_METRICS_FLUSH_INTERVAL секунд
+    добавляются в хеш Redis (бэкенд кеша по умолчанию), поэтому страница /metrics показывает сумму по всем
+    процессам: планировщику, обработчикам очереди и веб-серверу. Показатели (gauge) каждый процесс записывает
+    в собственный хеш со сроком жизни MAILING_METRICS_GAUGE_TTL секунд, поэтому показатели завершённых процессов
+    исчезают со страницы сами. Если кеш не является Redis, значения хранятся только в памяти процесса.
+
+    Атрибуты:
+        key (str): Ключ хеша Redis со значениями метрик.
+
+    Методы:
+        inc(name, value=1, **labels): Увеличивает счётчик.
+        observe(name, value, buckets=LATENCY_BUCKETS, **labels): Добавляет наблюдение в гистограмму.
+        set(name, value, **labels): Устанавливает значение показателя.
+        flush(): Передаёт накопленные значения в Redis.
+        collect(): Возвращает значения всех метрик.
+    """
+
+    def __init__(self, key='mailing-metrics'):
+        self.key = key
+        self._increments = defaultdict(float)
+        self._gauges = {}
+        self._totals = defaultdict(float)
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    def _get_gauges_key(self):
+        return f'{self.key}:gauges:{socket.gethostname()}:{os.getpid()}'
+
+    def _get_client(self):
+        if isinstance(cache, RedisCache):
+            return cache._cache.get_client(write=True)
+
+        return None
+
+    def inc(self, name, value=1, **labels):
+        """
+        Увеличивает счётчик.
+
+        Параметры:
+            name (str): Имя метрики.
+            value (float): Приращение.
+            **labels: Метки метрики.
+        """
+
+        with self._lock:
+            self._increments[_series(name, labels)] += value
+
+        self._maybe_flush()
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        """
+        Добавляет наблюдение в гистограмму.
+
+        Параметры:
+            name (str): Имя метрики.
+            value (float): Наблюдаемое значение.
+            buckets (tuple[float]): Верхние границы интервалов гистограммы.
+            **labels: Метки метрики.
+        """
+
+        with self._lock:
+            for bound in buckets:
+                self._increments[_series(f'{name}_bucket', {**labels, 'le': bound})] += value <= bound
+
+            self._increments[_series(f'{name}_bucket', {**labels, 'le': '+Inf'})] += 1
+            self._increments[_series(f'{name}_sum', labels)] += value
+            self._increments[_series(f'{name}_count', labels)] += 1
+
+        self._maybe_flush()
+
+    def set(self, name, value, **labels):
+        """
+        Устанавливает значение показателя.
+
+        Параметры:
+            name (str): Имя метрики.
+            value (float): Значение.
+            **labels: Метки метрики.
+        """
+
+        with self._lock:
+            self._gauges[_series(name, labels)] = value
+
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._flushed_at >= settings.MAILING_METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """
+        Передаёт накопленные значения в Redis.
+        """
+
+        with self._lock:
+            increments, self._increments = self._increments, defaultdict(float)
+            gauges, self._gauges = self._gauges, {}
+            self._flushed_at = time.monotonic()
+
+        if not increments and not gauges:
+            return
+
+        try:
+            client = self._get_client()
+        except Exception as e:
+            logger.warning('Не удалось подключиться к Redis для записи метрик: %s', e)
+            client = None
+
+        if client is not None:
+            try:
+                pipeline = client.pipeline(transaction=False)
+
+                for series, value in increments.items():
+                    pipeline.hincrbyfloat(self.key, series, value)
+
+                if gauges:
+                    gauges_key = self._get_gauges_key()
+                    pipeline.hset(gauges_key, mapping=gauges)
+                    pipeline.expire(gauges_key, settings.MAILING_METRICS_GAUGE_TTL)
+
+                pipeline.execute()
+
+                return
+            except Exception as e:
+                logger.warning('Не удалось записать метрики в Redis: %s', e)
+
+        with self._lock:
+            for series, value in increments.items():
+                self._totals[series] += value
+
+            self._totals.update(gauges)
+
+    def collect(self):
+        """
+        Возвращает значения всех метрик.
+
+        Возвращает:
+            dict: Значения по сериям вида 'имя{метка="значение"}'.
+        """
+
+        self.flush()
+
+        with self._lock:
+            values = dict(self._totals)
+
+        try:
+            client = self._get_client()
+
+            if client is not None:
+                for key in [self.key, *client.scan_iter(match=f'{self.key}:gauges:*')]:
+                    for series, value in client.hgetall(key).items():
+                        series = series.decode()
+                        values[series] = values.get(series, 0) + float(value)
+        except Exception as e:
+            logger.warning('Не удалось прочитать метрики из Redis: %s', e)
+
+        return values
+
+
+registry = MetricsRegistry()
+
+
+def _sort_key(series):
+    head, _, rest = series.partition('le="')
+    bound, _, tail = rest.partition('"')
+
+    return head + tail, float('inf') if bound == '+Inf' else float(bound or 0)
+
+
+def render_metrics(extra=None):
+    """
+    Формирует текст метрик в формате Prometheus.
+
+    Параметры:
+        extra (dict): Дополнительные значения по сериям, вычисленные в момент запроса.
+
+    Возвращает:
+        str: Текст метрик в формате Prometheus (text/plain; version=0.0.4).
+    """
+
+    values = registry.collect()
+    values.update(extra or {})
+    lines = []
+
+    for name, (kind, description) in METRICS.items():
+        names = (name, f'{name}_bucket', f'{name}_sum', f'{name}_count')
+        series = sorted((key for key in values if key.partition('{')[0] in names), key=_sort_key)
+
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(f'{key} {float(values[key])!r}' for key in series)
+
+    return '\n'.join(lines) + '\n'
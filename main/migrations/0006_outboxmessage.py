@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-17 05:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_alter_mailing_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_time', models.DateTimeField(verbose_name='Время запуска рассылки')),
+                ('status', models.CharField(choices=[('Новый', 'Новый'), ('Отправка', 'Отправка'), ('Отправлен', 'Отправлен'), ('Отклонен', 'Отклонен')], default='Новый', max_length=10, verbose_name='Статус')),
+                ('lease_owner', models.CharField(blank=True, max_length=100, null=True, verbose_name='Обработчик')),
+                ('lease_expires', models.DateTimeField(blank=True, null=True, verbose_name='Окончание аренды')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox', to='main.client', verbose_name='Клиент')),
+                ('mailing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox', to='main.mailing', verbose_name='Рассылка')),
+            ],
+            options={
+                'verbose_name': 'Письмо в очереди',
+                'verbose_name_plural': 'Очередь писем',
+                'indexes': [models.Index(fields=['status', 'lease_expires'], name='outbox_claim_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='outboxmessage',
+            constraint=models.UniqueConstraint(fields=('mailing', 'client', 'run_time'), name='unique_outbox_message'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-17 05:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_outboxmessage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mailing',
+            index=models.Index(fields=['status', 'scheduled_time'], name='mailing_due_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_mailing_due_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество попыток'),
+        ),
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Следующая попытка'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='outbox_retry_idx'),
+        ),
+    ]
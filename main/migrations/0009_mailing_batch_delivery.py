@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_outboxmessage_retry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mailing',
+            name='batch_delivery',
+            field=models.BooleanField(default=False, verbose_name='Пакетная отправка'),
+        ),
+    ]
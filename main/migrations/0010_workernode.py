@@ -0,0 +1,26 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_mailing_batch_delivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerNode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Узел')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='Время регистрации')),
+                ('heartbeat_at', models.DateTimeField(verbose_name='Последний пульс')),
+            ],
+            options={
+                'verbose_name': 'Узел отправки',
+                'verbose_name_plural': 'Узлы отправки',
+            },
+        ),
+    ]
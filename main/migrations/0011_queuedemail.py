@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:15
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_workernode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sender', models.CharField(max_length=254, verbose_name='Отправитель')),
+                ('recipients', models.JSONField(verbose_name='Получатели')),
+                ('data', models.BinaryField(verbose_name='Письмо')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Время постановки в очередь')),
+                ('status', models.CharField(choices=[('Новый', 'Новый'), ('Отправка', 'Отправка'), ('Отправлен', 'Отправлен'), ('Отклонен', 'Отклонен')], default='Новый', max_length=10, verbose_name='Статус')),
+                ('lease_owner', models.CharField(blank=True, max_length=100, null=True, verbose_name='Обработчик')),
+                ('lease_expires', models.DateTimeField(blank=True, null=True, verbose_name='Окончание аренды')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Количество попыток')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Следующая попытка')),
+                ('log_message', models.TextField(blank=True, null=True, verbose_name='Ответ сервера')),
+            ],
+            options={
+                'verbose_name': 'Служебное письмо',
+                'verbose_name_plural': 'Очередь служебных писем',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='queued_email_claim_idx')],
+            },
+        ),
+    ]
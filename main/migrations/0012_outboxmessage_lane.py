@@ -0,0 +1,22 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_queuedemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='lane',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Небольшая рассылка'), (2, 'Крупная рассылка')], default=2, verbose_name='Приоритет'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(fields=['lane', 'id'], name='outbox_lane_idx'),
+        ),
+    ]
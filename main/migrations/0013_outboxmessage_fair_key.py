@@ -0,0 +1,26 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_outboxmessage_lane'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='outboxmessage',
+            name='outbox_lane_idx',
+        ),
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='fair_key',
+            field=models.FloatField(default=0, verbose_name='Виртуальное время'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(condition=models.Q(('status__in', ['Новый', 'Отправка'])), fields=['lane', 'fair_key', 'id'], name='outbox_fair_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_outboxmessage_fair_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuppressedAddress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, verbose_name='Почта')),
+                ('reason', models.CharField(choices=[('bounce', 'Постоянная ошибка доставки'), ('unsubscribe', 'Отписка'), ('manual', 'Вручную')], default='manual', max_length=20, verbose_name='Причина')),
+                ('log_message', models.TextField(blank=True, null=True, verbose_name='Ответ сервера')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Время добавления')),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='suppressed_addresses', to=settings.AUTH_USER_MODEL, verbose_name='Владелец')),
+            ],
+            options={
+                'verbose_name': 'Подавленный адрес',
+                'verbose_name_plural': 'Список подавления',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='suppressedaddress',
+            constraint=models.UniqueConstraint(fields=('email', 'owner'), name='unique_suppressed_address'),
+        ),
+        migrations.AddConstraint(
+            model_name='suppressedaddress',
+            constraint=models.UniqueConstraint(condition=models.Q(('owner__isnull', True)), fields=('email',), name='unique_global_suppressed_address'),
+        ),
+    ]
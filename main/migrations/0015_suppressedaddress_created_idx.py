@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_suppressedaddress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='suppressedaddress',
+            index=models.Index(fields=['created_at'], name='suppressed_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_suppressedaddress_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mailing',
+            name='is_template',
+            field=models.BooleanField(default=False, verbose_name='Шаблон с полями клиента'),
+        ),
+    ]
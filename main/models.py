@@ -1,5 +1,8 @@
+from datetime import timedelta
+
 from django.core.cache import cache
 from django.db import models
+from django.utils import timezone
 
 from config import settings
 from users.models import User
@@ -110,6 +113,7 @@ class Mailing(models.Model):
 
     Перечисления:
         STATUS_CHOICES (list): Список возможных статусов рассылки.
+        ACTIVE_STATUSES (list): Статусы рассылок, которые продолжают отправляться по расписанию.
         PERIODICITY_CHOICES (list): Список возможных периодичностей рассылки.
 
     **Атрибуты:**
@@ -120,9 +124,15 @@ class Mailing(models.Model):
         periodicity (models.CharField): Периодичность рассылки, обязательное поле, максимальная длина 15 символов, по умолчанию 'Ежедневно'.
         clients (models.ManyToManyField): Список клиентов, которым будет отправлена рассылка.
         owner (models.ForeignKey): Владелец рассылки, связь с моделью пользователя (User), обязательное поле.
+        batch_delivery (models.BooleanField): Пакетная отправка: одно письмо отправляется сразу нескольким получателям
+                                              одного домена (скрытая копия), по умолчанию False. Не применяется
+                                              к персонализированным рассылкам.
+        is_template (models.BooleanField): Заголовок и содержание являются шаблонами с полями клиента
+                                           (см. MessageTemplate), по умолчанию False: текст отправляется как есть.
 
     Методы:
         __str__(): Возвращает заголовок рассылки.
+        get_next_scheduled_time(current_datetime): Возвращает время следующей отправки согласно периодичности.
         set_status_disregard(): Устанавливает статус рассылки 'Отклонен' и сохраняет изменения.
         get_total_mailings(): Статический метод, возвращает общее количество рассылок.
         get_active_mailings(): Статический метод, возвращает количество активных рассылок.
@@ -133,6 +143,7 @@ class Mailing(models.Model):
         ('Отправлен', 'Отправлен'),
         ('Отклонен', 'Отклонен'),
     ]
+    ACTIVE_STATUSES = ['Новый', 'Отправлен']
     PERIODICITY_CHOICES = [
         ('Ежедневно', 'Ежедневно'),
         ('Еженедельно', 'Еженедельно'),
@@ -147,6 +158,8 @@ class Mailing(models.Model):
                                    default='Ежедневно')
     clients = models.ManyToManyField(Client, verbose_name='Клиенты')
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mailing')
+    batch_delivery = models.BooleanField(default=False, verbose_name='Пакетная отправка')
+    is_template = models.BooleanField(default=False, verbose_name='Шаблон с полями клиента')
 
     def __str__(self):
         """
@@ -162,6 +175,9 @@ class Mailing(models.Model):
         verbose_name = 'Рассылка'
         verbose_name_plural = 'Рассылки'
 
+        indexes = [
+            models.Index(fields=['status', 'scheduled_time'], name='mailing_due_idx'),
+        ]
         permissions = [
             (
                 'set_status_disregard',
@@ -218,6 +234,25 @@ class Mailing(models.Model):
 
         return Mailing.objects.filter(status='Новый').count() + Mailing.objects.filter(status='Отправлен').count()
 
+    def get_next_scheduled_time(self, current_datetime):
+        """
+        Возвращает время следующей отправки рассылки согласно её периодичности.
+
+        Параметры:
+            current_datetime (datetime): Время, от которого отсчитывается период.
+
+        Возвращает:
+            datetime: Время следующей отправки.
+        """
+
+        match self.periodicity:
+            case 'Еженедельно':
+                return current_datetime + timedelta(days=7)
+            case 'Ежемесячно':
+                return current_datetime + timedelta(days=30)
+            case _:
+                return current_datetime + timedelta(days=1)
+
     def set_status_disregard(self):
         """
         Устанавливает статус рассылки 'Отклонен' и сохраняет изменения.
@@ -269,6 +304,240 @@ class MailingAttempt(models.Model):
         verbose_name_plural = 'Попытки отправки рассылок'
 
 
+class OutboxMessage(models.Model):
+    """
+    Модель представляет письмо рассылки одному клиенту в очереди на отправку (outbox).
+
+    Когда наступает время рассылки, для каждого её клиента создаётся запись очереди. Обработчики очереди забирают
+    записи пачками с блокировкой SELECT ... FOR UPDATE SKIP LOCKED и аренды (lease) на ограниченное время: запись
+    не может быть отправлена двумя обработчиками одновременно, а записи упавшего обработчика после истечения аренды
+    забираются снова. После временной ошибки доставки (код 4xx) запись возвращается в статус 'Новый' и забирается
+    повторно не раньше времени next_attempt_at. Письма небольших рассылок (полоса приоритета 'small') забираются
+    раньше писем крупных рассылок ('bulk'), поставленных в очередь раньше них. В пределах полосы письма забираются
+    в порядке виртуального времени fair_key, которое распределяет отправку между владельцами рассылок
+    пропорционально их весам (см. materialize_due_mailings).
+
+    Перечисления:
+        STATUS_CHOICES (list): Список возможных статусов записи очереди.
+        LANE_CHOICES (list): Список полос приоритета отправки (индексы main.delivery.envelope.LANES).
+
+    Атрибуты:
+        mailing (models.ForeignKey): Рассылка, к которой относится письмо.
+        client (models.ForeignKey): Клиент-получатель письма.
+        run_time (models.DateTimeField): Запланированное время запуска рассылки, к которому относится письмо.
+        status (models.CharField): Статус записи очереди, по умолчанию 'Новый'.
+        lease_owner (models.CharField): Идентификатор обработчика, забравшего запись.
+        lease_expires (models.DateTimeField): Время окончания аренды записи обработчиком.
+        attempts (models.PositiveIntegerField): Количество выполненных попыток отправки.
+        next_attempt_at (models.DateTimeField): Время, раньше которого запись не забирается для повторной отправки.
+        lane (models.PositiveSmallIntegerField): Полоса приоритета отправки, по умолчанию крупная рассылка.
+        fair_key (models.FloatField): Виртуальное время письма в справедливой очереди владельцев рассылок.
+    """
+
+    STATUS_CHOICES = [
+        ('Новый', 'Новый'),
+        ('Отправка', 'Отправка'),
+        ('Отправлен', 'Отправлен'),
+        ('Отклонен', 'Отклонен'),
+    ]
+
+    LANE_CHOICES = [
+        (1, 'Небольшая рассылка'),
+        (2, 'Крупная рассылка'),
+    ]
+
+    mailing = models.ForeignKey(Mailing, on_delete=models.CASCADE, related_name='outbox', verbose_name='Рассылка')
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='outbox', verbose_name='Клиент')
+    run_time = models.DateTimeField(verbose_name='Время запуска рассылки')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Новый', verbose_name='Статус')
+    lease_owner = models.CharField(max_length=100, verbose_name='Обработчик', **NULLABLE)
+    lease_expires = models.DateTimeField(verbose_name='Окончание аренды', **NULLABLE)
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Количество попыток')
+    next_attempt_at = models.DateTimeField(verbose_name='Следующая попытка', **NULLABLE)
+    lane = models.PositiveSmallIntegerField(choices=LANE_CHOICES, default=2, verbose_name='Приоритет')
+    fair_key = models.FloatField(default=0, verbose_name='Виртуальное время')
+
+    def __str__(self):
+        """
+        Строковое представление объекта OutboxMessage.
+
+        Возвращает:
+            str: Информация о рассылке, получателе и статусе письма.
+        """
+
+        return f'{self.mailing_id} -> {self.client_id}: {self.status}'
+
+    class Meta:
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+
+        constraints = [
+            models.UniqueConstraint(fields=['mailing', 'client', 'run_time'], name='unique_outbox_message'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'lease_expires'], name='outbox_claim_idx'),
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_retry_idx'),
+            models.Index(fields=['lane', 'fair_key', 'id'], name='outbox_fair_idx',
+                         condition=models.Q(status__in=['Новый', 'Отправка'])),
+        ]
+
+
+class QueuedEmail(models.Model):
+    """
+    Модель представляет служебное письмо (подтверждение почты, новый пароль и т.п.) в очереди на отправку.
+
+    Письма ставятся в очередь почтовым бэкендом QueuedEmailBackend в той же транзакции, что и изменение данных, и
+    отправляются планировщиком рассылок или обработчиком очереди, поэтому время ответа на запрос не включает
+    обмен с SMTP-сервером. Письмо хранится сериализованным целиком, как оно было сформировано Django.
+
+    Перечисления:
+        STATUS_CHOICES (list): Список возможных статусов письма.
+
+    Атрибуты:
+        sender (models.CharField): Адрес отправителя (MAIL FROM).
+        recipients (models.JSONField): Адреса получателей, которым письмо ещё не доставлено (RCPT TO).
+        data (models.BinaryField): Письмо целиком в виде байтов с переводами строк CRLF.
+        created_at (models.DateTimeField): Время постановки письма в очередь.
+        status (models.CharField): Статус письма, по умолчанию 'Новый'.
+        lease_owner (models.CharField): Идентификатор обработчика, забравшего письмо.
+        lease_expires (models.DateTimeField): Время окончания аренды письма обработчиком.
+        attempts (models.PositiveIntegerField): Количество выполненных попыток отправки.
+        next_attempt_at (models.DateTimeField): Время, раньше которого письмо не забирается для отправки, по умолчанию
+                                                время постановки в очередь.
+        log_message (models.TextField): Ответ SMTP-сервера на последнюю попытку отправки.
+    """
+
+    STATUS_CHOICES = OutboxMessage.STATUS_CHOICES
+
+    sender = models.CharField(max_length=254, verbose_name='Отправитель')
+    recipients = models.JSONField(verbose_name='Получатели')
+    data = models.BinaryField(verbose_name='Письмо')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Время постановки в очередь')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Новый', verbose_name='Статус')
+    lease_owner = models.CharField(max_length=100, verbose_name='Обработчик', **NULLABLE)
+    lease_expires = models.DateTimeField(verbose_name='Окончание аренды', **NULLABLE)
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Количество попыток')
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name='Следующая попытка')
+    log_message = models.TextField(verbose_name='Ответ сервера', **NULLABLE)
+
+    def __str__(self):
+        """
+        Строковое представление объекта QueuedEmail.
+
+        Возвращает:
+            str: Получатели и статус письма.
+        """
+
+        return f'{", ".join(self.recipients)}: {self.status}'
+
+    class Meta:
+        verbose_name = 'Служебное письмо'
+        verbose_name_plural = 'Очередь служебных писем'
+
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='queued_email_claim_idx'),
+        ]
+
+
+class SuppressedAddress(models.Model):
+    """
+    Модель представляет адрес в списке подавления: письма рассылок на такой адрес не отправляются.
+
+    Адрес попадает в общий список (без владельца) автоматически, если SMTP-сервер отклонил его в ответ на команду
+    RCPT TO как несуществующий (код 550, 551 или 553 либо статус 5.1.x, см. DeliveryResult.mailbox_rejected);
+    ошибки подключения, авторизации, MAIL FROM и DATA адрес не подавляют. В список владельца рассылки адрес
+    попадает, если получатель отписался от его рассылок.
+    Перед отправкой адреса проверяются по снимку списка в памяти процесса (см. main.delivery.suppression).
+
+    Перечисления:
+        REASON_CHOICES (list): Список возможных причин подавления.
+
+    Атрибуты:
+        email (models.EmailField): Адрес получателя в нижнем регистре.
+        owner (models.ForeignKey): Владелец рассылок, для которого подавлен адрес; пусто для общего списка.
+        reason (models.CharField): Причина подавления.
+        log_message (models.TextField): Ответ SMTP-сервера, из-за которого адрес был подавлен.
+        created_at (models.DateTimeField): Время добавления адреса в список.
+    """
+
+    REASON_CHOICES = [
+        ('bounce', 'Постоянная ошибка доставки'),
+        ('unsubscribe', 'Отписка'),
+        ('manual', 'Вручную'),
+    ]
+
+    email = models.EmailField(verbose_name='Почта')
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='suppressed_addresses',
+                              verbose_name='Владелец', **NULLABLE)
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, default='manual', verbose_name='Причина')
+    log_message = models.TextField(verbose_name='Ответ сервера', **NULLABLE)
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Время добавления')
+
+    def __str__(self):
+        """
+        Строковое представление объекта SuppressedAddress.
+
+        Возвращает:
+            str: Адрес и причина подавления.
+        """
+
+        return f'{self.email}: {self.get_reason_display()}'
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет адрес в нижнем регистре, в котором он проверяется перед отправкой.
+        """
+
+        self.email = self.email.lower()
+        super().save(*args, **kwargs)
+
+    class Meta:
+        verbose_name = 'Подавленный адрес'
+        verbose_name_plural = 'Список подавления'
+
+        constraints = [
+            models.UniqueConstraint(fields=['email', 'owner'], name='unique_suppressed_address'),
+            models.UniqueConstraint(fields=['email'], condition=models.Q(owner__isnull=True),
+                                    name='unique_global_suppressed_address'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='suppressed_created_idx'),
+        ]
+
+
+class WorkerNode(models.Model):
+    """
+    Модель представляет узел кластера, отправляющий рассылки, в таблице участников с периодическим пульсом.
+
+    Каждый узел в отдельном потоке раз в MAILING_NODE_HEARTBEAT_INTERVAL секунд обновляет время своего пульса
+    и удаляет записи узлов, пульс которых устарел; время берётся по часам базы данных. Рассылки распределяются между
+    узлами с актуальным пульсом по консистентному хешированию (см. main.sharding).
+
+    Атрибуты:
+        name (models.CharField): Уникальное имя узла в формате 'хост:pid'.
+        started_at (models.DateTimeField): Время регистрации узла.
+        heartbeat_at (models.DateTimeField): Время последнего пульса узла.
+    """
+
+    name = models.CharField(max_length=100, unique=True, verbose_name='Узел')
+    started_at = models.DateTimeField(auto_now_add=True, verbose_name='Время регистрации')
+    heartbeat_at = models.DateTimeField(verbose_name='Последний пульс')
+
+    def __str__(self):
+        """
+        Строковое представление объекта WorkerNode.
+
+        Возвращает:
+            str: Имя узла.
+        """
+
+        return self.name
+
+    class Meta:
+        verbose_name = 'Узел отправки'
+        verbose_name_plural = 'Узлы отправки'
+
+
 class BlogPost(models.Model):
     """
     Модель представляет статью блога.
@@ -0,0 +1,108 @@
+import logging
+import select
+import threading
+
+from django.db import DatabaseError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'mailing_schedule'
+
+local_wakeup = threading.Event()
+
+
+def notify_schedule_changed(using='default'):
+    """
+    Сообщает планировщику рассылок, что расписание изменилось и ближайший запуск нужно пересчитать.
+
+    В PostgreSQL отправляется уведомление NOTIFY, которое доставляется слушателям при фиксации текущей транзакции,
+    в том числе планировщику в другом процессе. Планировщик в текущем процессе будится напрямую после фиксации.
+
+    Параметры:
+        using (str): Псевдоним базы данных из настройки DATABASES.
+    """
+
+    connection = connections[using]
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'NOTIFY {CHANNEL}')
+
+    transaction.on_commit(local_wakeup.set, using=using)
+
+
+class ScheduleListener:
+    """
+    Ожидание уведомлений об изменении расписания рассылок.
+
+    В PostgreSQL слушатель выполняет LISTEN на отдельном соединении и ждёт уведомлений через select() на его сокете.
+    Для остальных баз данных учитываются только изменения, сделанные в текущем процессе.
+
+    Атрибуты:
+        using (str): Псевдоним базы данных из настройки DATABASES.
+
+    Методы:
+        wait(timeout): Ждёт уведомления не дольше timeout секунд.
+        close(): Закрывает соединение слушателя.
+    """
+
+    def __init__(self, using='default'):
+        self.using = using
+        self._connection = None
+
+    def _listen(self):
+        if self._connection is None:
+            connection = connections.create_connection(self.using)
+
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+
+            self._connection = connection
+
+        return self._connection
+
+    def wait(self, timeout):
+        """
+        Ждёт уведомления об изменении расписания.
+
+        Параметры:
+            timeout (float): Максимальное время ожидания в секундах.
+
+        Возвращает:
+            bool: Получено уведомление (при потере соединения также возвращается True, чтобы расписание
+                  было пересчитано).
+        """
+
+        try:
+            connection = self._listen()
+
+            if connection.vendor != 'postgresql':
+                notified = local_wakeup.wait(timeout)
+            else:
+                raw = connection.connection
+                notified = local_wakeup.is_set() or bool(select.select([raw], [], [], timeout)[0])
+                raw.poll()
+                notified = notified or bool(raw.notifies)
+                raw.notifies.clear()
+        except (DatabaseError, OSError) as e:
+            logger.error('Соединение слушателя расписания потеряно: %s', e)
+            self.close()
+            notified = True
+
+        local_wakeup.clear()
+
+        return notified
+
+    def close(self):
+        """
+        Закрывает соединение слушателя.
+        """
+
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except DatabaseError:
+                pass
+
+            self._connection = None
@@ -0,0 +1,226 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+PROFILE_REQUEST_KEY = 'mailing-profile-request'
+
+_state = threading.local()
+
+_NULL_STAGE = nullcontext()
+
+_cache_failed = False
+
+
+class TickProfile:
+    """
+    Время этапов одного запуска отправки рассылок.
+
+    Этапы могут быть вложены друг в друга (например, запись в базу данных внутри постановки в очередь), поэтому
+    сумма времени этапов может превышать длительность запуска.
+
+    Атрибуты:
+        name (str): Название запуска.
+        stages (dict): Суммарное время этапов в секундах.
+        mailings (dict): Время этапов в секундах по рассылкам {рассылка: {этап: время}}.
+
+    Методы:
+        add(stage, seconds, mailing=None, total=True): Добавляет время этапа.
+        summary(): Возвращает текстовую сводку по этапам и самым медленным рассылкам.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = defaultdict(float)
+        self.mailings = defaultdict(lambda: defaultdict(float))
+
+    def add(self, stage, seconds, mailing=None, total=True):
+        """
+        Добавляет время этапа.
+
+        Параметры:
+            stage (str): Название этапа.
+            seconds (float): Время в секундах.
+            mailing (int): Идентификатор рассылки, к которой относится время, если известен.
+            total (bool): Учитывать ли время в общем времени этапа (False для времени, которое выполнялось
+                          параллельно и не отражает длительность запуска, например задержек SMTP).
+        """
+
+        if total:
+            self.stages[stage] += seconds
+
+        if mailing is not None:
+            self.mailings[mailing][stage] += seconds
+
+    def summary(self, limit=5):
+        """
+        Возвращает текстовую сводку по этапам и самым медленным рассылкам.
+
+        Параметры:
+            limit (int): Количество рассылок в сводке.
+
+        Возвращает:
+            str: Сводка вида 'smtp=3.210s claim=0.052s; рассылка 7: render=0.300s'.
+        """
+
+        stages = ' '.join(f'{stage}={seconds:.3f}s' for stage, seconds in
+                          sorted(self.stages.items(), key=lambda item: -item[1]))
+        slowest = sorted(self.mailings.items(), key=lambda item: -sum(item[1].values()))[:limit]
+        mailings = '; '.join(
+            f'рассылка {mailing}: ' + ' '.join(f'{stage}={seconds:.3f}s' for stage, seconds in timings.items())
+            for mailing, timings in slowest
+        )
+
+        return f'{stages}; {mailings}' if mailings else stages
+
+
+class _Stage:
+    __slots__ = ('profile', 'name', 'mailing', 'started')
+
+    def __init__(self, profile, name, mailing):
+        self.profile = profile
+        self.name = name
+        self.mailing = mailing
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profile.add(self.name, time.perf_counter() - self.started, self.mailing)
+
+
+def active():
+    """
+    Возвращает сводку текущего запуска, если замер этапов включён.
+
+    Возвращает:
+        TickProfile | None: Сводка запуска, выполняющегося в текущем потоке.
+    """
+
+    return getattr(_state, 'profile', None)
+
+
+def stage(name, mailing=None):
+    """
+    Замеряет время этапа текущего запуска.
+
+    Если замер этапов не включён, возвращается пустой контекстный менеджер без накладных расходов на замер.
+
+    Параметры:
+        name (str): Название этапа.
+        mailing (int): Идентификатор рассылки, к которой относится этап.
+
+    Возвращает:
+        Контекстный менеджер замера.
+
+    Использование:
+        with stage('claim'):
+            messages = claim_messages(worker_id)
+    """
+
+    profile = getattr(_state, 'profile', None)
+
+    if profile is None:
+        return _NULL_STAGE
+
+    return _Stage(profile, name, mailing)
+
+
+def request_profile():
+    """
+    Запрашивает запись профиля cProfile для следующего запуска отправки в любом процессе.
+    """
+
+    cache.set(PROFILE_REQUEST_KEY, True, timeout=None)
+
+
+def _take_profile_request():
+    global _cache_failed
+
+    try:
+        capture = bool(cache.get(PROFILE_REQUEST_KEY)) and cache.delete(PROFILE_REQUEST_KEY)
+    except Exception as e:
+        if not _cache_failed:
+            logger.warning('Не удалось проверить запрос профиля: %s', e)
+
+        _cache_failed = True
+
+        return False
+
+    _cache_failed = False
+
+    return capture
+
+
+@contextmanager
+def profile_tick(name):
+    """
+    Замеряет этапы одного запуска отправки рассылок.
+
+    При включённой настройке MAILING_STAGE_TIMING время этапов (см. stage()) записывается в лог и в гистограмму
+    mailing_stage_seconds. Если запрошена запись профиля (см. request_profile()), запуск выполняется под cProfile,
+    а профиль и его текстовая сводка сохраняются в каталог MAILING_PROFILE_DIR. Профилируется только поток запуска:
+    отправка SMTP в потоке движка доставки видна в профиле как ожидание результатов.
+
+    Запрос профиля проверяется чтением ключа кеша, ключ удаляется только если запрос есть. Недоступность кеша
+    записывается в лог один раз, до восстановления связи.
+
+    Параметры:
+        name (str): Название запуска для лога и имени файла профиля.
+    """
+
+    capture = _take_profile_request()
+
+    if not (settings.MAILING_STAGE_TIMING or capture):
+        yield
+        return
+
+    profile = _state.profile = TickProfile(name)
+    profiler = cProfile.Profile() if capture else None
+    started = time.perf_counter()
+
+    if profiler is not None:
+        profiler.enable()
+
+    try:
+        yield profile
+    finally:
+        if profiler is not None:
+            profiler.disable()
+
+        elapsed = time.perf_counter() - started
+        _state.profile = None
+
+        for stage_name, seconds in profile.stages.items():
+            registry.observe('mailing_stage_seconds', seconds, stage=stage_name)
+
+        logger.info('Запуск %s: %.3f с; %s', name, elapsed, profile.summary())
+
+        if profiler is not None:
+            _dump_profile(profiler, name)
+
+
+def _dump_profile(profiler, name):
+    os.makedirs(settings.MAILING_PROFILE_DIR, exist_ok=True)
+    path = os.path.join(settings.MAILING_PROFILE_DIR, f'{name}-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}')
+    profiler.dump_stats(f'{path}.prof')
+
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(50)
+
+    with open(f'{path}.txt', 'w') as file:
+        file.write(report.getvalue())
+
+    logger.info('Профиль запуска %s сохранён в %s.prof', name, path)
@@ -0,0 +1,169 @@
+import bisect
+import hashlib
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection
+from django.db.models.functions import Now
+
+from .delivery.outbox import get_worker_id
+from .models import WorkerNode
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """
+    Кольцо консистентного хеширования узлов кластера.
+
+    Каждый узел занимает на кольце replicas виртуальных точек; ключ принадлежит узлу первой точки по часовой стрелке
+    от хеша ключа. При добавлении или удалении узла переходит к другим узлам только доля ключей, соответствующая
+    этому узлу, остальные ключи остаются на своих узлах.
+
+    Атрибуты:
+        nodes (tuple[str]): Имена узлов в порядке сортировки.
+        replicas (int): Количество виртуальных точек на узел.
+
+    Методы:
+        get_node(key): Возвращает узел, которому принадлежит ключ.
+    """
+
+    def __init__(self, nodes, replicas=None):
+        self.nodes = tuple(sorted(nodes))
+        self.replicas = replicas or settings.MAILING_SHARD_REPLICAS
+        points = sorted((_hash(f'{node}#{replica}'), node) for node in self.nodes for replica in range(self.replicas))
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def get_node(self, key):
+        """
+        Возвращает узел, которому принадлежит ключ.
+
+        Параметры:
+            key: Ключ, например идентификатор рассылки.
+
+        Возвращает:
+            str | None: Имя узла либо None, если кольцо пусто.
+        """
+
+        if not self._points:
+            return None
+
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+
+        return self._owners[index]
+
+
+class NodeMembership:
+    """
+    Участие узла в кластере отправки рассылок через таблицу узлов с пульсом (модель WorkerNode).
+
+    Пульс отправляется отдельным потоком (см. start_heartbeat) раз в MAILING_NODE_HEARTBEAT_INTERVAL секунд
+    независимо от отправки рассылок, поэтому узел, занятый долгой отправкой, не считается выбывшим.
+    При каждом вызове heartbeat() узел обновляет время своего пульса, удаляет узлы, пульс которых старше
+    MAILING_NODE_TTL секунд, и перестраивает кольцо консистентного хеширования по оставшимся узлам. Поэтому при
+    подключении нового узла или остановке (падении) существующего рассылки перераспределяются автоматически
+    не позже чем через MAILING_NODE_TTL секунд, без отдельного брокера очередей.
+
+    Во время перераспределения два узла могут одновременно считать рассылку своей: повторная постановка в очередь
+    исключается блокировкой рассылки и ограничением уникальности очереди (см. materialize_due_mailings).
+
+    Атрибуты:
+        name (str): Имя текущего узла.
+        ring (HashRing): Кольцо узлов по результатам последнего пульса.
+
+    Методы:
+        heartbeat(): Обновляет пульс узла и состав кластера.
+        start_heartbeat(stop_event): Запускает поток пульса.
+        owns(key): Проверяет, принадлежит ли ключ текущему узлу.
+        leave(): Удаляет узел из кластера.
+    """
+
+    def __init__(self, name=None):
+        self.name = name or get_worker_id()
+        self.ring = HashRing([self.name])
+
+    def heartbeat(self):
+        """
+        Обновляет время пульса узла, удаляет узлы с устаревшим пульсом и перестраивает кольцо.
+
+        Время пульса и порог устаревания берутся по часам базы данных (Now()), а не узла, поэтому расхождение часов
+        узлов не приводит к исключению живых узлов из кольца. Если база данных недоступна, кольцо не меняется.
+
+        Возвращает:
+            HashRing: Кольцо узлов кластера.
+        """
+
+        try:
+            WorkerNode.objects.update_or_create(name=self.name, defaults={'heartbeat_at': Now()})
+            WorkerNode.objects.filter(heartbeat_at__lt=Now() - timedelta(seconds=settings.MAILING_NODE_TTL)).delete()
+            nodes = set(WorkerNode.objects.values_list('name', flat=True))
+        except DatabaseError as e:
+            logger.error('Не удалось обновить пульс узла %s: %s', self.name, e)
+
+            return self.ring
+
+        if set(self.ring.nodes) != nodes:
+            logger.info('Состав узлов отправки изменился: %s -> %s', ', '.join(self.ring.nodes),
+                        ', '.join(sorted(nodes)))
+            self.ring = HashRing(nodes)
+
+        return self.ring
+
+    def start_heartbeat(self, stop_event):
+        """
+        Обновляет пульс узла и запускает поток, обновляющий его раз в MAILING_NODE_HEARTBEAT_INTERVAL секунд,
+        пока не установлено событие остановки.
+
+        Первый пульс отправляется до возврата из метода, чтобы узел не считал своими рассылки других узлов.
+
+        Параметры:
+            stop_event (threading.Event): Событие остановки потока.
+
+        Возвращает:
+            threading.Thread: Запущенный поток.
+        """
+
+        self.heartbeat()
+        thread = threading.Thread(target=self._run_heartbeat, args=(stop_event,), name='node-heartbeat', daemon=True)
+        thread.start()
+
+        return thread
+
+    def _run_heartbeat(self, stop_event):
+        while not stop_event.wait(settings.MAILING_NODE_HEARTBEAT_INTERVAL):
+            close_old_connections()
+            self.heartbeat()
+
+        connection.close()
+
+    def owns(self, key):
+        """
+        Проверяет, принадлежит ли ключ текущему узлу.
+
+        Параметры:
+            key: Ключ, например идентификатор рассылки.
+
+        Возвращает:
+            bool: Ключ принадлежит текущему узлу.
+        """
+
+        return self.ring.get_node(key) == self.name
+
+    def leave(self):
+        """
+        Удаляет узел из кластера, чтобы его рассылки сразу перешли к остальным узлам.
+        """
+
+        try:
+            WorkerNode.objects.filter(name=self.name).delete()
+        except DatabaseError:
+            pass
+
+        self.ring = HashRing([self.name])
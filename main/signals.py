@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Mailing
+from .notifications import notify_schedule_changed
+
+
+@receiver(post_save, sender=Mailing)
+def mailing_saved(sender, instance, update_fields=None, **kwargs):
+    """
+    Будит планировщик рассылок при создании или изменении рассылки пользователем.
+
+    Сохранения с явным списком полей (update_fields) выполняются самим планировщиком при переносе рассылки
+    на следующий период и не требуют пересчёта расписания.
+
+    Параметры:
+        sender (type): Класс модели Mailing.
+        instance (Mailing): Сохранённая рассылка.
+        update_fields (frozenset): Список сохранённых полей, если он был указан.
+    """
+
+    if update_fields is None:
+        notify_schedule_changed()
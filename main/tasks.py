@@ -1,31 +1,73 @@
-import smtplib
+import logging
+import threading
+import time
 from datetime import datetime, timedelta
 
-from django.core.mail import send_mail
 from django.conf import settings
-from apscheduler.schedulers.background import BackgroundScheduler
+from django.db import close_old_connections, connection, connections
+from django.db.models import Min
+from django.utils import timezone
 import pytz
 
-from .models import Mailing, MailingAttempt
+from .delivery.engine import close_delivery_engine
+from .delivery import mailqueue
+from .delivery.mailqueue import process_queued_emails, purge_queued_emails, start_transactional_lane
+from .delivery.outbox import materialize_due_mailings, process_outbox, purge_finished_messages
+from .delivery.pool import close_connection_pool
+from .leader import LeaderElection
+from .metrics import registry
+from .models import Mailing, OutboxMessage, QueuedEmail
+from .profiling import profile_tick, stage
+from .sharding import NodeMembership
 
+logger = logging.getLogger(__name__)
 
-def send_mailing():
+leader_election = LeaderElection()
+
+membership = NodeMembership()
+
+shutdown_event = threading.Event()
+
+wakeup_requested = threading.Event()
+
+_transactional_lane = None
+
+_heartbeat = None
+
+_purged_at = float('-inf')
+
+
+def send_mailing(owns=None):
     """
     Функция для отправки запланированных рассылок клиентам.
 
     Функция выполняет следующие действия:
         1. Определяет текущую дату и время в заданной временной зоне.
-        2. Получает все рассылки, запланированные на текущее время или ранее.
-        3. Для каждой найденной рассылки:
-            - Отправляет сообщение всем клиентам, привязанным к данной рассылке.
-            - Записывает попытки отправки в базу данных.
-            - Обновляет статус рассылки в зависимости от успешности отправки.
-            - Если рассылка была успешной, обновляет время следующей запланированной отправки в зависимости
-              от периодичности.
-        4. Сохраняет изменения в базе данных.
-
-    Исключения:
-        smtplib.SMTPException: Ловит исключения SMTP при отправке письма и записывает их в лог сообщения.
+        2. Отправляет служебные письма, поставленные в очередь почтовым бэкендом QueuedEmailBackend
+           (см. main.delivery.mailqueue). В процессе планировщика они также отправляются отдельным потоком
+           во время отправки рассылок.
+        3. Ставит в очередь отправки (outbox) по одному письму на каждого клиента каждой рассылки, запланированной
+           на текущее время или ранее (если задана функция owns - только рассылки текущего узла кластера),
+           и переносит такие рассылки на следующий период согласно периодичности.
+        4. Забирает письма из очереди пачками и отправляет их через движок параллельной доставки, записывая
+           попытки отправки в базу данных пакетами по мере получения результатов. Новые пачки забираются
+           не дольше MAILING_SCHEDULER_TICK_BUDGET секунд; если письма были отправлены, устанавливается
+           wakeup_requested, и следующий запуск начинается сразу, чтобы рассылки, время которых наступило
+           за время отправки, попали в очередь, не дожидаясь окончания крупной рассылки.
+        5. Устанавливает итоговый статус рассылок, все письма которых обработаны.
+        6. Не чаще чем раз в MAILING_PURGE_INTERVAL секунд удаляет устаревшие обработанные письма рассылок
+           и служебные письма из очередей (см. purge_finished_records).
+
+    Ошибки SMTP не прерывают рассылку: они возвращаются движком доставки по каждому получателю и записываются
+    в лог попытки отправки. Очередь может одновременно обрабатываться несколькими процессами
+    (см. команду run_outbox_worker). После установки shutdown_event новые пачки писем из очереди не забираются,
+    текущая пачка отправляется до конца.
+
+    Время этапов запуска записывается в лог при включённой настройке MAILING_STAGE_TIMING, профиль cProfile
+    записывается по запросу команды profile_mailing_tick (см. main.profiling).
+
+    Параметры:
+        owns (callable): Функция, проверяющая по идентификатору рассылки, что она принадлежит текущему узлу.
 
     Возвращает:
         None
@@ -34,47 +76,221 @@ def send_mailing():
     zone = pytz.timezone(settings.TIME_ZONE)
     current_datetime = datetime.now(zone)
 
-    mailings = Mailing.objects.filter(scheduled_time__lte=current_datetime)
+    with profile_tick('send_mailing'):
+        process_queued_emails(stop_event=shutdown_event)
+        materialize_due_mailings(current_datetime, owns)
 
-    if not mailings.exists():
+        if process_outbox(stop_event=shutdown_event, budget=settings.MAILING_SCHEDULER_TICK_BUDGET):
+            wakeup_requested.set()
+
+        purge_finished_records()
+
+
+def purge_finished_records(force=False):
+    """
+    Удаляет устаревшие обработанные письма из очереди рассылок (см. purge_finished_messages) и из очереди служебных
+    писем (см. purge_queued_emails), если с прошлой очистки в этом процессе прошло не меньше MAILING_PURGE_INTERVAL
+    секунд.
+
+    Параметры:
+        force (bool): Выполнить очистку независимо от интервала.
+    """
+
+    global _purged_at
+
+    now = time.monotonic()
+
+    if not force and now - _purged_at < settings.MAILING_PURGE_INTERVAL:
         return
 
-    for mailing in mailings:
-        if mailing.status == 'Отклонен':
-            continue
+    _purged_at = now
+
+    with stage('purge'):
+        purge_finished_messages()
+        purge_queued_emails()
+
+
+def run_scheduled_mailings():
+    """
+    Периодическая задача планировщика: отправляет рассылки, только если текущий экземпляр является ведущим.
+
+    Планировщик запускается в каждом процессе, но благодаря выбору ведущего через advisory-блокировку базы данных
+    рассылки обрабатывает ровно один экземпляр в кластере. Остальные экземпляры лишь пытаются взять блокировку
+    и подхватывают работу, если ведущий завершился.
+
+    При включённой настройке MAILING_SHARDED_SCHEDULING ведущий не выбирается: каждый экземпляр ставит в очередь
+    только рассылки, которые принадлежат ему по консистентному хешированию (см. main.sharding), а письма очереди
+    отправляют все экземпляры. Пульс узла обновляется отдельным потоком, запущенным функцией start().
+
+    Задача выполняется в потоке планировщика, поэтому до и после неё закрываются устаревшие и оборванные
+    соединения этого потока с базой данных.
+
+    Возвращает:
+        None
+    """
+
+    close_old_connections()
+
+    try:
+        if not settings.MAILING_SHARDED_SCHEDULING and not leader_election.acquire():
+            return
+
+        started = time.monotonic()
+        send_mailing(membership.owns if settings.MAILING_SHARDED_SCHEDULING else None)
+        registry.observe('mailing_scheduler_tick_seconds', time.monotonic() - started)
+    finally:
+        close_old_connections()
+
+
+def get_next_run_time():
+    """
+    Вычисляет время следующего запуска планировщика.
+
+    Ведущий экземпляр просыпается ровно ко времени ближайшей активной рассылки (запрос MIN(scheduled_time)
+    по индексу (status, scheduled_time)), ближайшей повторной отправки письма из очереди (кроме писем отключённых
+    рассылок, которые не забираются на отправку, см. claim_messages) или служебного письма, но не реже чем раз
+    в MAILING_SCHEDULER_MAX_IDLE секунд, чтобы подобрать письма очереди с истёкшей арендой.
+    Новые служебные письма будят планировщик уведомлением. Остальные экземпляры проверяют лидерство раз
+    в MAILING_SCHEDULER_FAILOVER_INTERVAL секунд, не обращаясь к рассылкам.
+
+    При включённой настройке MAILING_SHARDED_SCHEDULING ведущим считается каждый экземпляр, а ближайшая рассылка
+    выбирается только среди рассылок текущего узла, чтобы узел не просыпался ради рассылок других узлов.
+
+    Возвращает:
+        datetime: Время следующего запуска.
+    """
+
+    now = timezone.now()
+
+    if not settings.MAILING_SHARDED_SCHEDULING and not leader_election.is_leader:
+        return now + timedelta(seconds=settings.MAILING_SCHEDULER_FAILOVER_INTERVAL)
+
+    run_time = now + timedelta(seconds=settings.MAILING_SCHEDULER_MAX_IDLE)
+    active = Mailing.objects.filter(status__in=Mailing.ACTIVE_STATUSES)
+
+    if settings.MAILING_SHARDED_SCHEDULING:
+        next_due = _get_next_owned_due(active)
+    else:
+        next_due = active.aggregate(next_due=Min('scheduled_time'))['next_due']
+
+    next_retry = (OutboxMessage.objects.filter(status='Новый').exclude(mailing__status='Отклонен')
+                  .aggregate(next_retry=Min('next_attempt_at'))['next_retry'])
+
+    next_email = (QueuedEmail.objects.filter(status='Новый')
+                  .aggregate(next_email=Min('next_attempt_at'))['next_email'])
 
-        clients = mailing.clients.all()
-        successful = True
+    for due in (next_due, next_retry, next_email):
+        if due is not None:
+            run_time = max(now, min(run_time, due))
 
-        for client in clients:
-            try:
-                send_mail(subject=mailing.title,
-                          message=mailing.message,
-                          from_email=settings.EMAIL_HOST_USER,
-                          recipient_list=[client.email],
-                          fail_silently=False)
-                MailingAttempt.objects.create(mailing=mailing, status='Отправлен',
-                                              log_message=f'Успешная отправка на {client.email}')
+    return run_time
 
-            except smtplib.SMTPException as e:
-                successful = False
-                MailingAttempt.objects.create(mailing=mailing, status='Отклонен', log_message=str(e))
 
-        mailing.status = 'Отправлен' if successful else 'Отклонен'
+def _get_next_owned_due(mailings):
+    for pk, scheduled_time in mailings.order_by('scheduled_time').values_list('pk', 'scheduled_time').iterator():
+        if membership.owns(pk):
+            return scheduled_time
 
-        if successful:
-            match mailing.periodicity:
-                case 'Ежедневно':
-                    mailing.scheduled_time = current_datetime + timedelta(days=1)
-                case 'Еженедельно':
-                    mailing.scheduled_time = current_datetime + timedelta(days=7)
-                case 'Ежемесячно':
-                    mailing.scheduled_time = current_datetime + timedelta(days=30)
+    return None
+
+
+def run_scheduler_loop():
+    """
+    Цикл планировщика рассылок, выполняющийся в отдельном потоке до установки shutdown_event.
+
+    После каждого запуска отправки (см. run_scheduled_mailings) поток ждёт события wakeup_requested не дольше,
+    чем до времени следующего запуска (см. get_next_run_time). Запуски выполняются строго по одному: уведомление,
+    полученное во время отправки, оставляет событие установленным, и следующий запуск начинается сразу после
+    завершения текущего. Ошибка запуска записывается в лог и не останавливает цикл.
+    """
+
+    while not shutdown_event.is_set():
+        try:
+            run_scheduled_mailings()
+        except Exception:
+            logger.exception('Ошибка отправки рассылок')
+
+        if shutdown_event.is_set():
+            break
+
+        try:
+            timeout = (get_next_run_time() - timezone.now()).total_seconds()
+        except Exception:
+            logger.exception('Не удалось вычислить время следующего запуска планировщика')
+            timeout = settings.MAILING_SCHEDULER_FAILOVER_INTERVAL
+        finally:
+            close_old_connections()
+
+        wakeup_requested.wait(max(0.0, timeout))
+        wakeup_requested.clear()
+
+    connection.close()
+
+
+def wake_up():
+    """
+    Запускает отправку досрочно, не дожидаясь времени следующего запуска.
+
+    Вызывается при получении уведомления об изменении рассылок. Если отправка уже выполняется, следующий запуск
+    произойдёт сразу после её завершения.
+    """
 
-        mailing.save()
+    wakeup_requested.set()
+    mailqueue.wakeup.set()
 
 
 def start():
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(send_mailing, 'interval', seconds=10)
+    """
+    Запускает фоновый планировщик рассылок.
+
+    Вместо опроса базы с фиксированным интервалом поток планировщика (см. run_scheduler_loop) спит до времени
+    ближайшей рассылки (см. get_next_run_time) и после каждого запуска вычисляет его заново. Досрочно отправка
+    запускается функцией wake_up(). Служебные письма отправляются отдельным потоком (см. start_transactional_lane),
+    чтобы не ждать окончания отправки крупной рассылки.
+
+    Возвращает:
+        threading.Thread: Запущенный поток планировщика.
+    """
+
+    global _transactional_lane, _heartbeat
+
+    _transactional_lane = start_transactional_lane(shutdown_event)
+
+    if settings.MAILING_SHARDED_SCHEDULING:
+        _heartbeat = membership.start_heartbeat(shutdown_event)
+
+    scheduler = threading.Thread(target=run_scheduler_loop, name='mailing-scheduler', daemon=True)
     scheduler.start()
+
+    return scheduler
+
+
+def stop(scheduler):
+    """
+    Корректно останавливает планировщик рассылок.
+
+    Новые пачки писем из очереди больше не забираются, текущая отправка завершается, после чего освобождается
+    лидерство (или узел удаляется из таблицы узлов) и закрываются SMTP-соединения и соединения с базой данных.
+
+    Параметры:
+        scheduler (threading.Thread): Поток планировщика, запущенный функцией start().
+    """
+
+    shutdown_event.set()
+    wakeup_requested.set()
+    scheduler.join()
+    leader_election.release()
+    mailqueue.wakeup.set()
+
+    if _transactional_lane is not None:
+        _transactional_lane.join()
+
+    if _heartbeat is not None:
+        _heartbeat.join()
+
+    if settings.MAILING_SHARDED_SCHEDULING:
+        membership.leave()
+
+    close_delivery_engine()
+    close_connection_pool()
+    connections.close_all()
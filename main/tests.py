@@ -0,0 +1,232 @@
+import asyncio
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from .delivery.aiosmtp import AsyncSMTPConnection, AsyncSMTPTransport
+from .delivery.engine import DeliveryEngine
+from .delivery.envelope import STAGE_CONNECT, STAGE_DATA, STAGE_MAIL, STAGE_RCPT, Envelope
+from .delivery.outbox import claim_messages, deliver_messages, materialize_due_mailings
+from .delivery.pool import SMTPConnectionPool
+from .delivery.sink import SMTPSink
+from .delivery.suppression import suppression_list
+from .models import Client, Mailing, MailingAttempt, OutboxMessage, SuppressedAddress
+from users.models import User
+
+CONNECTION_KWARGS = {'username': '', 'password': '', 'use_tls': False, 'use_ssl': False}
+
+
+class ScriptedSink(SMTPSink):
+    """
+    SMTP-сервер-заглушка с заданными ответами на команды.
+
+    Атрибуты:
+        replies (dict): Ответы по команде ('MAIL', 'DATA') или по адресу получателя для команды RCPT TO.
+        drops (int): Количество первых команд MAIL FROM, на которые сервер обрывает соединение.
+    """
+
+    def __init__(self, replies=None, drops=0, **kwargs):
+        super().__init__(keep_messages=True, **kwargs)
+        self.replies = replies or {}
+        self.drops = drops
+
+    async def reply_to(self, command, session):
+        if command == 'MAIL' and self.drops:
+            self.drops -= 1
+            raise ConnectionResetError
+
+        if command == 'RCPT':
+            recipient = session['line'].partition(':')[2].strip('<>')
+
+            return self.replies.get(recipient)
+
+        return self.replies.get(command)
+
+
+def _by_recipient(results):
+    return {result.recipient: result for result in results}
+
+
+class AsyncSMTPConnectionTest(SimpleTestCase):
+    envelope = Envelope('sender@example.com', ['ok@example.com', 'gone@example.com', 'busy@example.com'],
+                        b'Subject: Test\r\n\r\nHello\r\n')
+
+    def _send(self, sink, *envelopes):
+        async def send():
+            conn = AsyncSMTPConnection(sink.host, sink.port, timeout=5, **CONNECTION_KWARGS)
+            await conn.open()
+
+            try:
+                return [await conn.send(envelope) for envelope in envelopes]
+            finally:
+                await conn.close()
+
+        return asyncio.run(send())
+
+    def test_partial_rcpt_rejection(self):
+        replies = {'gone@example.com': b'550 5.1.1 No such user\r\n', 'busy@example.com': b'451 4.2.1 Try later\r\n'}
+
+        with ScriptedSink(replies) as sink:
+            [results] = self._send(sink, self.envelope)
+
+        results = _by_recipient(results)
+        self.assertEqual((results['ok@example.com'].code, results['ok@example.com'].stage), (250, STAGE_DATA))
+        self.assertEqual((results['gone@example.com'].code, results['gone@example.com'].stage), (550, STAGE_RCPT))
+        self.assertTrue(results['gone@example.com'].mailbox_rejected)
+        self.assertTrue(results['busy@example.com'].transient)
+        self.assertEqual(sink.messages[0][1], [b'<ok@example.com>'])
+
+    def test_partial_rcpt_rejection_and_data_failure(self):
+        replies = {'gone@example.com': b'550 5.1.1 No such user\r\n', 'DATA': b'554 5.6.0 Content rejected\r\n'}
+
+        with ScriptedSink(replies) as sink:
+            [results] = self._send(sink, self.envelope)
+
+        results = _by_recipient(results)
+        self.assertEqual((results['gone@example.com'].code, results['gone@example.com'].stage), (550, STAGE_RCPT))
+        self.assertEqual((results['ok@example.com'].code, results['ok@example.com'].stage), (554, STAGE_DATA))
+        self.assertTrue(results['ok@example.com'].permanent)
+        self.assertFalse(results['ok@example.com'].mailbox_rejected)
+
+    def test_mail_failure(self):
+        with ScriptedSink({'MAIL': b'530 5.7.0 Authentication required\r\n'}) as sink:
+            [results] = self._send(sink, self.envelope)
+
+        self.assertEqual({(result.code, result.stage) for result in results}, {(530, STAGE_MAIL)})
+        self.assertTrue(all(result.session_failed and result.transient for result in results))
+        self.assertFalse(any(result.permanent or result.mailbox_rejected for result in results))
+        self.assertEqual(sink.delivered, 0)
+
+    def test_connection_reusable_after_mail_failure(self):
+        class RejectFirstMail(ScriptedSink):
+            async def reply_to(self, command, session):
+                if command == 'MAIL' and not session.get('rejected'):
+                    session['rejected'] = True
+
+                    return b'451 4.3.0 Try again\r\n'
+
+        with RejectFirstMail() as sink:
+            first, second = self._send(sink, self.envelope, self.envelope)
+
+        self.assertTrue(all(result.stage == STAGE_MAIL for result in first))
+        self.assertTrue(all(result.ok for result in second))
+        self.assertEqual(sink.sessions, 1)
+
+
+class AsyncSMTPTransportTest(SimpleTestCase):
+    envelope = Envelope('sender@example.com', ['ok@example.com'], b'Subject: Test\r\n\r\nHello\r\n')
+
+    def _send(self, sink):
+        async def send():
+            transport = AsyncSMTPTransport(host=sink.host, port=sink.port, timeout=5, **CONNECTION_KWARGS)
+
+            try:
+                return await transport.send(self.envelope)
+            finally:
+                await transport.aclose()
+
+        return asyncio.run(send())
+
+    def test_retry_after_disconnect(self):
+        with ScriptedSink(drops=1) as sink:
+            results = self._send(sink)
+
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual((sink.sessions, sink.delivered), (2, 1))
+
+    def test_repeated_disconnect(self):
+        with ScriptedSink(drops=2) as sink:
+            results = self._send(sink)
+
+        self.assertEqual([(result.code, result.stage) for result in results], [(None, STAGE_CONNECT)])
+        self.assertTrue(results[0].transient)
+        self.assertEqual(sink.delivered, 0)
+
+
+class SMTPConnectionPoolTest(SimpleTestCase):
+    def test_stages_match_async_transport(self):
+        envelope = Envelope('sender@example.com', ['ok@example.com', 'gone@example.com'],
+                            b'Subject: Test\r\n\r\nHello\r\n')
+        replies = {'gone@example.com': b'550 5.1.1 No such user\r\n', 'DATA': b'554 5.6.0 Content rejected\r\n'}
+
+        with ScriptedSink(replies) as sink:
+            pool = SMTPConnectionPool(size=1, host=sink.host, port=sink.port, timeout=5, **CONNECTION_KWARGS)
+
+            try:
+                results = _by_recipient(pool.send_batch([envelope]))
+            finally:
+                pool.close()
+
+        self.assertEqual((results['gone@example.com'].code, results['gone@example.com'].stage), (550, STAGE_RCPT))
+        self.assertEqual((results['ok@example.com'].code, results['ok@example.com'].stage), (554, STAGE_DATA))
+
+
+class DeliverMessagesTest(TestCase):
+    emails = ['ok@example.com', 'gone@example.com', 'busy@example.com', 'policy@example.com']
+
+    def setUp(self):
+        suppression_list.refresh(force=True)
+        self.owner = User.objects.create(email='owner@example.com')
+        self.mailing = Mailing.objects.create(title='Тема', message='Текст', scheduled_time=timezone.now(),
+                                              owner=self.owner)
+        self.mailing.clients.set([Client.objects.create(email=email, last_name='Иванов', first_name='Иван',
+                                                        owner=self.owner) for email in self.emails])
+        materialize_due_mailings(timezone.now())
+
+    def _deliver(self, sink):
+        engine = DeliveryEngine(transport=AsyncSMTPTransport(host=sink.host, port=sink.port, timeout=5,
+                                                             **CONNECTION_KWARGS))
+
+        try:
+            return deliver_messages(claim_messages('test'), engine, 'test')
+        finally:
+            engine.close()
+
+    def _statuses(self):
+        return dict(OutboxMessage.objects.values_list('client__email', 'status'))
+
+    def test_result_classification(self):
+        replies = {
+            'gone@example.com': b'550 5.1.1 No such user\r\n',
+            'busy@example.com': b'451 4.2.1 Mailbox busy\r\n',
+            'policy@example.com': b'550 5.7.1 Message refused by policy\r\n',
+        }
+
+        with ScriptedSink(replies) as sink:
+            session_failed = self._deliver(sink)
+
+        self.assertFalse(session_failed)
+        self.assertEqual(self._statuses(), {'ok@example.com': 'Отправлен', 'gone@example.com': 'Отклонен',
+                                            'busy@example.com': 'Новый', 'policy@example.com': 'Отклонен'})
+        busy = OutboxMessage.objects.get(client__email='busy@example.com')
+        self.assertEqual(busy.attempts, 1)
+        self.assertGreater(busy.next_attempt_at, timezone.now())
+        self.assertEqual(list(SuppressedAddress.objects.values_list('email', 'owner', 'reason')),
+                         [('gone@example.com', None, 'bounce')])
+        self.assertEqual(MailingAttempt.objects.filter(mailing=self.mailing).count(), len(self.emails))
+
+    def test_session_failure_is_retried(self):
+        with ScriptedSink({'MAIL': b'530 5.7.0 Authentication required\r\n'}) as sink:
+            session_failed = self._deliver(sink)
+
+        self.assertTrue(session_failed)
+        self.assertEqual(set(self._statuses().values()), {'Новый'})
+        self.assertFalse(SuppressedAddress.objects.exists())
+
+    def test_data_failure_rejects_without_suppression(self):
+        with ScriptedSink({'DATA': b'554 5.6.0 Content rejected\r\n'}) as sink:
+            self._deliver(sink)
+
+        self.assertEqual(set(self._statuses().values()), {'Отклонен'})
+        self.assertFalse(SuppressedAddress.objects.exists())
+
+    def test_suppressed_address_is_skipped(self):
+        SuppressedAddress.objects.create(email='gone@example.com', reason='bounce')
+        suppression_list.refresh(force=True)
+
+        with ScriptedSink() as sink:
+            self._deliver(sink)
+
+        self.assertEqual(self._statuses()['gone@example.com'], 'Отклонен')
+        self.assertNotIn(b'<gone@example.com>', [recipient for _, recipients, _ in sink.messages
+                                                 for recipient in recipients])
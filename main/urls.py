@@ -4,7 +4,8 @@ from django.views.decorators.cache import cache_page
 from main.apps import MainConfig
 from main.views import MailingListView, MailingDetailView, MailingCreateView, MailingUpdateView, MailingDeleteView, \
     MailingAttemptListView, ClientListView, ClientDetailView, ClientCreateView, ClientUpdateView, ClientDeleteView, \
-    index, BlogListView, BlogDetailView, BlogCreateView, BlogUpdateView, BlogDeleteView, set_mailing_status_disregard
+    index, BlogListView, BlogDetailView, BlogCreateView, BlogUpdateView, BlogDeleteView, set_mailing_status_disregard, \
+    metrics, unsubscribe
 
 app_name = MainConfig.name
 
@@ -27,4 +28,6 @@ urlpatterns = [
     path('blog/<int:pk>/edit/', BlogUpdateView.as_view(), name='blog_edit'),
     path('blog/<int:pk>/delete/', BlogDeleteView.as_view(), name='blog_delete'),
     path('mailings/disregard/<int:mailing_id>/', set_mailing_status_disregard, name='disregard_mailing'),
+    path('metrics', metrics, name='metrics'),
+    path('unsubscribe/<str:token>/', unsubscribe, name='unsubscribe'),
 ]
@@ -1,12 +1,23 @@
+from django.conf import settings
 from django.contrib.auth.decorators import permission_required
+from django.db.models import Q
+from django.core import signing
+from django.core.cache import cache
+from django.core.mail import send_mail
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils import timezone
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy
+from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 
+from .delivery.suppression import get_unsubscribe_url, load_unsubscribe_token, suppress_addresses
+from .metrics import render_metrics
 from .mixins import OwnerRequiredMixin, EmailVerificationRequiredMixin, StaffOrOwnerRequiredMixin
-from .models import Mailing, MailingAttempt, Client, BlogPost
-from .forms import MailingForm, ClientForm
+from .models import Mailing, MailingAttempt, Client, BlogPost, OutboxMessage, SuppressedAddress
+from .forms import MailingForm, ClientForm, UnsubscribeForm
+from users.models import User
 
 
 def index(request, *args, **kwargs):
@@ -488,3 +499,111 @@ def set_mailing_status_disregard(request, mailing_id):
     mailing.set_status_disregard()
 
     return redirect('main:mailings')
+
+
+def metrics(request):
+    """
+    Метрики отправки рассылок в формате Prometheus.
+
+    Проверка прав:
+        Если задана настройка MAILING_METRICS_TOKEN, запрос должен содержать заголовок
+        'Authorization: Bearer <токен>'. Без токена метрики доступны только персоналу (is_staff).
+
+    Параметры:
+        - request (HttpRequest): Объект HTTP-запроса.
+
+    Возвращает:
+        HttpResponse: Текст метрик: счётчики и гистограммы отправки, накопленные всеми процессами, а также размер
+                      очереди писем и количество рассылок, время отправки которых наступило. Размеры очереди
+                      кешируются на MAILING_METRICS_BACKLOG_CACHE_TIMEOUT секунд, чтобы частый сбор метрик
+                      не нагружал базу данных.
+    """
+
+    token = settings.MAILING_METRICS_TOKEN
+
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponseForbidden()
+    elif not request.user.is_staff:
+        return HttpResponseForbidden()
+
+    key = 'mailing_metrics_backlog'
+    gauges = cache.get(key)
+
+    if gauges is None:
+        now = timezone.now()
+        backlog = OutboxMessage.objects.filter(
+            Q(status='Новый', next_attempt_at__isnull=True) | Q(status='Новый', next_attempt_at__lte=now)
+            | Q(status='Отправка')
+        ).count()
+        due = Mailing.objects.filter(status__in=Mailing.ACTIVE_STATUSES, scheduled_time__lte=now).count()
+        gauges = {'mailing_outbox_backlog': backlog, 'mailing_due_mailings': due}
+        cache.set(key, gauges, timeout=settings.MAILING_METRICS_BACKLOG_CACHE_TIMEOUT)
+
+    text = render_metrics(gauges)
+
+    return HttpResponse(text, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@csrf_exempt
+def unsubscribe(request, token):
+    """
+    Отписка получателя от рассылок владельца по ссылке из заголовка List-Unsubscribe.
+
+    Проверка прав:
+        Ссылка подписана (см. get_unsubscribe_url), авторизация не требуется. Защита от CSRF отключена, потому что
+        почтовые клиенты отправляют отписку в один клик запросом POST без cookie (RFC 8058).
+
+    Параметры:
+        - request (HttpRequest): Объект HTTP-запроса.
+        - token (str): Подписанный токен с идентификатором владельца рассылок и адресом получателя.
+
+    Возвращает:
+        HttpResponse: Страница подтверждения отписки (GET) или сообщение об успешной отписке (POST).
+
+    Описание:
+        По запросу GET отображается форма подтверждения, чтобы переход по ссылке, например антивирусным сканером
+        почты, не отписывал получателя. По запросу POST адрес добавляется в список подавления владельца, и письма
+        его рассылок на этот адрес больше не отправляются.
+
+        Ссылка из письма пакетной отправки не содержит адреса получателя. В этом случае страница запрашивает адрес
+        и отправляет на него личную ссылку отписки, чтобы по общей ссылке нельзя было отписать чужой адрес. Письмо
+        отправляется, только если адрес есть среди клиентов владельца, но ответ страницы от этого не зависит.
+
+    Исключения:
+        - Http404: Будет вызвано, если подпись токена неверна или владелец рассылок не найден.
+    """
+
+    try:
+        owner, email = load_unsubscribe_token(token)
+    except signing.BadSignature:
+        raise Http404
+
+    if not User.objects.filter(pk=owner).exists():
+        raise Http404
+
+    if email is None:
+        return _request_unsubscribe_link(request, owner)
+
+    done = request.method == 'POST'
+
+    if done:
+        suppress_addresses([SuppressedAddress(email=email, owner_id=owner, reason='unsubscribe')])
+
+    return render(request, 'main/unsubscribe.html', {'email': email, 'done': done})
+
+
+def _request_unsubscribe_link(request, owner):
+    form = UnsubscribeForm(request.POST if request.method == 'POST' else None)
+
+    if not form.is_valid():
+        return render(request, 'main/unsubscribe.html', {'form': form})
+
+    email = form.cleaned_data['email'].lower()
+
+    if Client.objects.filter(owner_id=owner, email__iexact=email).exists():
+        send_mail('Отписка от рассылок',
+                  f'Чтобы отписаться от рассылок, перейдите по ссылке: {get_unsubscribe_url(owner, email)}',
+                  settings.DEFAULT_FROM_EMAIL, [email])
+
+    return render(request, 'main/unsubscribe.html', {'email': email, 'link_sent': True})
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-17 06:20
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_alter_user_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='mailing_weight',
+            field=models.PositiveIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Вес при отправке рассылок'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+import logging
 import uuid
 
 from django.apps import apps
@@ -5,9 +6,12 @@ from django.conf import settings
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import AbstractUser
+from django.core.validators import MinValueValidator
 from django.core.mail import send_mail
 from django.db import models
 
+logger = logging.getLogger(__name__)
+
 NULLABLE = {
     'blank': True,
     'null': True
@@ -116,6 +120,8 @@ class User(AbstractUser):
         - email_verification_token: Токен для подтверждения электронной почты. Генерируется автоматически.
         - first_name: Имя пользователя. Максимальная длина 50 символов. Может быть пустым.
         - last_name: Фамилия пользователя. Максимальная длина 50 символов. Может быть пустым.
+        - mailing_weight: Вес пользователя при распределении пропускной способности отправки рассылок между
+                          владельцами (например, больше 1 для премиальных аккаунтов). По умолчанию 1.
 
     Специальные атрибуты:
         - USERNAME_FIELD: Поле, используемое в качестве логина (в данном случае 'email').
@@ -144,6 +150,8 @@ class User(AbstractUser):
     email_verification_token = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     first_name = models.CharField(max_length=50, verbose_name='Имя', **NULLABLE)
     last_name = models.CharField(max_length=50, verbose_name='Фамилия', **NULLABLE)
+    mailing_weight = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)],
+                                                 verbose_name='Вес при отправке рассылок')
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
@@ -177,7 +185,7 @@ class User(AbstractUser):
         message = f'Please verify your email address by clicking the following link: {verification_url}'
         send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [self.email])
 
-        print('message sent')
+        logger.info('Письмо для подтверждения почты пользователю %s поставлено в очередь', self.email)
 
     def save(self, *args, **kwargs):
         """